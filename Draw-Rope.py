@@ -30,6 +30,7 @@ def applyWind(force, ropes):
         rope.wind = force
 
 ropeList = []
+web = Web()
 wind = 50
 while not gameExit:
     gameDisplay.fill((255, 255, 255))
@@ -45,7 +46,7 @@ while not gameExit:
                 endTemp = pygame.mouse.get_pos()
                 numNodes = int(lineLength(startTemp, endTemp) * 0.8)
                 newRope = Rope(numNodes, startTemp[0], startTemp[1],
-                                     endTemp[0], endTemp[1])
+                               endTemp[0], endTemp[1], web, "TAUT SILK")
                 ropeList.append(newRope)
                 for other in ropeList:
                     temp = newRope.solveIntersection(other)
@@ -54,9 +55,9 @@ while not gameExit:
         drawWebLine(gameDisplay, startTemp, pygame.mouse.get_pos())
     applyWind(wind, ropeList)
     wind = random.randint(-500, -50)  # Simulate wind speeds
+    web.step()  # Steps every rope at once
     for rope in ropeList:
-        rope.updateRope()
-        rope.drawRope(gameDisplay)
+        rope.drawRope(gameDisplay, (0, 0, 0))
 
     pygame.display.update()
     clock.tick(50)
@@ -1,151 +1,1968 @@
 import pygame
+import numpy as np
 import math
+import multiprocessing
+from multiprocessing import shared_memory
+
+
+def springForces(x, y, xVel, yVel, a, b, length, k, friction):
+    # Force every spring (a, b) puts on its b node; its a node gets the
+    # opposite. Same maths as Spring.solveSpring.
+    yLength = y[b] - y[a]
+    xLength = x[b] - x[a]
+    vector = np.hypot(xLength, yLength)
+    stretched = vector > 0
+    safe = np.where(stretched, vector, 1)
+    pull = (vector - length) * k / safe
+    forceY = np.where(stretched, -yLength * pull +
+                      (yVel[a] - yVel[b]) * friction, 0)
+    forceX = np.where(stretched, -xLength * pull +
+                      (xVel[a] - xVel[b]) * friction, 0)
+    return forceX, forceY
+
+
+def moveNodes(x, y, xVel, yVel, xForce, yForce, mass, free, t):
+    # Euler step of every free node, truncating positions like moveMass
+    yVel[free] += (yForce[free] / mass[free]) * t
+    y[free] += np.trunc(yVel[free] * t)
+    xVel[free] += (xForce[free] / mass[free]) * t
+    x[free] += np.trunc(xVel[free] * t)
+
+
+def integerSqrt(values):
+    # Floor square root of non-negative int64 values, exact: the float
+    # estimate is nudged until root^2 <= value < (root + 1)^2
+    root = np.sqrt(values.astype(float)).astype(np.int64)
+    for i in range(2):
+        root -= root * root > values
+        root += (root + 1) * (root + 1) <= values
+    return root
+
+
+def solveBlockTridiagonal(diagonal, upper, right):
+    # Thomas algorithm over 2x2 blocks for many chains in lockstep.
+    # Blocks come as their entries: diagonal is (d00, d01, d10, d11), each
+    # (n, chains), upper the same but (n - 1, chains) and couples node j to
+    # node j + 1 (and its transpose j + 1 to j), right is (r0, r1). O(n)
+    # steps, each vectorised over the chains on contiguous rows. Returns
+    # the answer as (a0, a1).
+    d00, d01, d10, d11 = diagonal
+    u00, u01, u10, u11 = upper
+    r0, r1 = right
+    n = len(d00)
+    f00, f01, f10, f11 = [np.zeros(u00.shape) for i in range(4)]
+    a0, a1 = np.zeros(r0.shape), np.zeros(r1.shape)
+    for j in range(n):
+        p00, p01, p10, p11 = d00[j], d01[j], d10[j], d11[j]
+        q0, q1 = r0[j], r1[j]
+        if j > 0:
+            # Take away the transposed upper block times the last factor
+            l00, l01, l10, l11 = u00[j - 1], u10[j - 1], u01[j - 1], \
+                u11[j - 1]
+            p00 = p00 - l00 * f00[j - 1] - l01 * f10[j - 1]
+            p01 = p01 - l00 * f01[j - 1] - l01 * f11[j - 1]
+            p10 = p10 - l10 * f00[j - 1] - l11 * f10[j - 1]
+            p11 = p11 - l10 * f01[j - 1] - l11 * f11[j - 1]
+            q0 = q0 - l00 * a0[j - 1] - l01 * a1[j - 1]
+            q1 = q1 - l10 * a0[j - 1] - l11 * a1[j - 1]
+        # Closed form inverse of every 2x2 pivot at once
+        determinant = p00 * p11 - p01 * p10
+        i00, i01 = p11 / determinant, -p01 / determinant
+        i10, i11 = -p10 / determinant, p00 / determinant
+        if j < n - 1:
+            f00[j] = i00 * u00[j] + i01 * u10[j]
+            f01[j] = i00 * u01[j] + i01 * u11[j]
+            f10[j] = i10 * u00[j] + i11 * u10[j]
+            f11[j] = i10 * u01[j] + i11 * u11[j]
+        a0[j] = i00 * q0 + i01 * q1
+        a1[j] = i10 * q0 + i11 * q1
+    for j in range(n - 2, -1, -1):
+        a0[j] -= f00[j] * a0[j + 1] + f01[j] * a1[j + 1]
+        a1[j] -= f10[j] * a0[j + 1] + f11[j] * a1[j + 1]
+    return a0, a1
+
+
+def pointSegmentDistance(px, py, ax, ay, bx, by):
+    # Distance from points (px, py) to segments from (ax, ay) to (bx, by)
+    xLength, yLength = bx - ax, by - ay
+    squared = xLength**2 + yLength**2
+    along = np.clip(((px - ax) * xLength + (py - ay) * yLength) /
+                    np.where(squared > 0, squared, 1), 0, 1)
+    return np.hypot(px - ax - along * xLength, py - ay - along * yLength)
+
+
+def closestSegmentPoints(ax, ay, bx, by, cx, cy, dx, dy):
+    # Parameters s along AB and u along CD of the closest points between
+    # the two segments
+    abx, aby, cdx, cdy = bx - ax, by - ay, dx - cx, dy - cy
+    rx, ry = ax - cx, ay - cy
+    ab = abx * abx + aby * aby
+    cd = cdx * cdx + cdy * cdy
+    both = abx * cdx + aby * cdy
+    abr = abx * rx + aby * ry
+    cdr = cdx * rx + cdy * ry
+    safeAb = np.where(ab > 0, ab, 1)
+    safeCd = np.where(cd > 0, cd, 1)
+    denominator = ab * cd - both * both
+    s = np.where(denominator > 1e-9, np.clip(
+        (both * cdr - abr * cd) / np.where(denominator > 1e-9, denominator,
+                                           1), 0, 1), 0)
+    u = (both * s + cdr) / safeCd
+    s = np.where(u < 0, np.clip(-abr / safeAb, 0, 1),
+                 np.where(u > 1, np.clip((both - abr) / safeAb, 0, 1), s))
+    s = np.where(ab > 0, s, 0)
+    u = np.clip((both * s + cdr) / safeCd, 0, 1)
+    return s, u
+
+
+def segmentDistance(ax, ay, bx, by, cx, cy, dx, dy):
+    # Closest distance between segments AB and CD, 0 where they cross
+    def side(px, py, qx, qy, rx, ry):
+        return np.sign((qx - px) * (ry - py) - (qy - py) * (rx - px))
+    crossing = ((side(ax, ay, bx, by, cx, cy) *
+                 side(ax, ay, bx, by, dx, dy) < 0) &
+                (side(cx, cy, dx, dy, ax, ay) *
+                 side(cx, cy, dx, dy, bx, by) < 0))
+    closest = np.minimum(
+        np.minimum(pointSegmentDistance(ax, ay, cx, cy, dx, dy),
+                   pointSegmentDistance(bx, by, cx, cy, dx, dy)),
+        np.minimum(pointSegmentDistance(cx, cy, ax, ay, bx, by),
+                   pointSegmentDistance(dx, dy, ax, ay, bx, by)))
+    return np.where(crossing, 0, closest)
+
+
+class Web(object):
+    # Struct-of-arrays store for every node and spring in the game. Node,
+    # Spring and Rope objects are views onto these arrays, so the whole web
+    # is solved with a handful of array operations per step. The web is one
+    # graph: a junction is a single node with more springs, so it is
+    # integrated exactly once per step however many strands meet there.
+    # Integrators
+    EULER = 0
+    VERLET = 1
+    IMPLICIT = 2
+    FIXED = 3
+    # Which strands go first when the web is over budget
+    OLDEST = 0
+    LEAST_LOADED = 1
+    # One in fixed point for the FIXED integrator, which works in 48.16
+    fixedScale = 1 << 16
+    gravity = 2
+    t = 0.3
+    # Wind pushes a node of windMass with its full force
+    windMass = 100
+    # Node mass and spring rest length, stiffness and friction of every
+    # material. Springs only keep the row of their material; a spring
+    # standing in for span original springs in a row is span times as long
+    # and 1 / span times as stiff.
+    materials = {
+        "SILK": (100, 0.75, 300, 50),
+        "TAUT SILK": (100, 0.75, 500, 50),
+        "CORD": (300, 1, 425, 280)
+    }
+    MASS = 0
+    LENGTH = 1
+    K = 2
+    FRICTION = 3
+    nodeFields = ("x", "y", "xLast", "yLast", "xVel", "yVel", "xForce",
+                  "yForce", "mass", "wind", "restWind", "fixed", "asleep",
+                  "alive")
+    springFields = ("springA", "springB", "springRope", "span",
+                    "springMaterial", "springAlive")
+
+    def __init__(self, capacity=64, integrator=EULER):
+        self.integrator = integrator
+        self.t = Web.t
+        self.gravity = Web.gravity
+        self.materialNames = list(Web.materials)
+        self.materialTable = np.array(
+            [Web.materials[name] for name in self.materialNames], dtype=float)
+        # Verlet relaxation passes per step and velocity kept per step
+        self.iterations = 8
+        self.damping = 0.98
+        # Conjugate gradient limits for junctioned islands when implicit
+        self.solverIterations = 60
+        self.solverTolerance = 1e-8
+        # An island sleeps when its kinetic energy per node averaged over
+        # sleepSteps steps is below sleepEnergy, and wakes when its wind
+        # moves by more than wakeWind or a fixed node of it is moved more
+        # than wakeMove from where it fell asleep
+        self.sleepSteps = 60
+        self.sleepEnergy = 10
+        self.wakeWind = 60
+        self.wakeMove = 1
+        # Rope.remesh merges a node once its strand turns by less than
+        # mergeTurn radians there, up to maxSpan springs in one, and splits
+        # springs again where it turns by more than splitTurn
+        self.mergeTurn = 0.03
+        self.splitTurn = 0.15
+        self.maxSpan = 8
+        self.numNodes = 0
+        self.numSprings = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        # Positions before the last step, for drawing between two steps
+        self.xLast = np.zeros(capacity)
+        self.yLast = np.zeros(capacity)
+        self.xVel = np.zeros(capacity)
+        self.yVel = np.zeros(capacity)
+        self.xForce = np.zeros(capacity)
+        self.yForce = np.zeros(capacity)
+        self.mass = np.zeros(capacity)
+        self.wind = np.zeros(capacity)
+        # Wind when the node fell asleep
+        self.restWind = np.zeros(capacity)
+        self.fixed = np.zeros(capacity, dtype=bool)
+        self.asleep = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.springA = np.zeros(capacity, dtype=np.intp)
+        self.springB = np.zeros(capacity, dtype=np.intp)
+        self.springRope = np.zeros(capacity, dtype=np.intp)
+        self.span = np.zeros(capacity)
+        self.springMaterial = np.zeros(capacity, dtype=np.int8)
+        self.springAlive = np.zeros(capacity, dtype=bool)
+        # Slots of removed nodes and springs, reused before growing
+        self.freeNodes = []
+        self.freeSprings = []
+        self.ropes = []
+        # Bumped whenever anything moves or changes
+        self.version = 0
+        # Bumped whenever springs are added or rewired
+        self.topologyVersion = 0
+        self.adjacencyVersion = -1
+        self.liveVersion = -1
+        self.islandVersion = -1
+        # Bumped whenever an island falls asleep or wakes up
+        self.sleepVersion = 0
+        self.batchVersion = None
+        # Optional WebWorkers, used for batches of at least parallelNodes
+        self.workers = None
+        self.parallelNodes = 20000
+        # Islands with no node inside view, (x, y, width, height), are only
+        # stepped every lodRate steps, lodRate times as long. A different
+        # share of them goes each step so the cost is spread out.
+        self.view = None
+        self.lodRate = 4
+        self.stepCount = 0
+        self.lodVersion = None
+        # Euler steps an island in up to maxSubsteps substeps when its
+        # springs are too stiff for the step (past stableStep in units of
+        # the step times the natural frequency) or its nodes would move
+        # more than errorTolerance off their true path. Nodes faster than
+        # maxSpeed are slowed back down to it.
+        self.adaptive = True
+        self.maxSubsteps = 8
+        self.stableStep = 1.6
+        self.errorTolerance = 4
+        self.maxSpeed = 200
+        self.substepKey = None
+        # Live nodes and springs allowed, or None for no limit. Past either,
+        # ropesToEvict picks strands to take the web back down to evictTo
+        # of it, so strands go in batches and the cost of finding them is
+        # spread over many strands.
+        self.nodeBudget = None
+        self.springBudget = None
+        self.evictTo = 0.8
+        self.eviction = Web.OLDEST
+
+    @staticmethod
+    def grow(obj, fields, size):
+        # Double the capacity of every array in fields until size fits
+        capacity = len(getattr(obj, fields[0]))
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in fields:
+            old = getattr(obj, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(obj, name, new)
+
+    def material(self, name):
+        return self.materialNames.index(name)
+
+    def newNode(self, x, y, fixed=False, material=0):
+        if len(self.freeNodes) > 0:
+            i = self.freeNodes.pop()
+        else:
+            Web.grow(self, Web.nodeFields, self.numNodes + 1)
+            i = self.numNodes
+            self.numNodes += 1
+        self.x[i], self.y[i] = x, y
+        self.xLast[i], self.yLast[i] = x, y
+        self.xVel[i] = self.yVel[i] = 0
+        self.xForce[i] = self.yForce[i] = 0
+        self.mass[i] = self.materialTable[material, Web.MASS]
+        self.wind[i] = self.restWind[i] = 0
+        self.fixed[i] = fixed
+        self.asleep[i] = False
+        self.alive[i] = True
+        self.topologyVersion += 1
+        self.version += 1
+        return Node(self, i)
+
+    def newSpring(self, node1, node2, ropeId=-1, span=1, material=0):
+        if len(self.freeSprings) > 0:
+            i = self.freeSprings.pop()
+        else:
+            Web.grow(self, Web.springFields, self.numSprings + 1)
+            i = self.numSprings
+            self.numSprings += 1
+        self.springA[i] = node1.index
+        self.springB[i] = node2.index
+        self.springRope[i] = ropeId
+        self.springMaterial[i] = material
+        self.springAlive[i] = True
+        self.span[i] = span
+        self.topologyVersion += 1
+        self.version += 1
+        return Spring(self, i)
+
+    def newSlots(self, free, fields, used, count):
+        # count slots, reusing free ones in the order newNode and newSpring
+        # would pop them. Returns them and how many slots are now in use.
+        reused = free[len(free) - min(count, len(free)):][::-1]
+        del free[len(free) - len(reused):]
+        Web.grow(self, fields, used + count - len(reused))
+        slots = np.concatenate((np.array(reused, dtype=np.intp),
+                                np.arange(used, used + count - len(reused))))
+        return slots, used + count - len(reused)
+
+    def newNodes(self, x, y, fixed=False, material=0):
+        # newNode for a whole array of positions at once
+        i, self.numNodes = self.newSlots(self.freeNodes, Web.nodeFields,
+                                         self.numNodes, len(x))
+        self.x[i] = self.xLast[i] = x
+        self.y[i] = self.yLast[i] = y
+        self.xVel[i] = self.yVel[i] = 0
+        self.xForce[i] = self.yForce[i] = 0
+        self.mass[i] = self.materialTable[material, Web.MASS]
+        self.wind[i] = self.restWind[i] = 0
+        self.fixed[i] = fixed
+        self.asleep[i] = False
+        self.alive[i] = True
+        self.topologyVersion += 1
+        self.version += 1
+        return i
+
+    def newSprings(self, a, b, ropeId=-1, span=1, material=0):
+        # newSpring for whole arrays of node indices at once
+        i, self.numSprings = self.newSlots(self.freeSprings, Web.springFields,
+                                           self.numSprings, len(a))
+        self.springA[i] = a
+        self.springB[i] = b
+        self.springRope[i] = ropeId
+        self.springMaterial[i] = material
+        self.springAlive[i] = True
+        self.span[i] = span
+        self.topologyVersion += 1
+        self.version += 1
+        return i
+
+    def setSpan(self, springs, span):
+        self.span[springs] = span
+
+    def springParameters(self, springs):
+        # Rest length, stiffness and friction of springs from their
+        # material. Springs in a row add their lengths and soften, like
+        # resistors.
+        table = self.materialTable[self.springMaterial[springs]]
+        span = self.span[springs]
+        return (table[:, Web.LENGTH] * span, table[:, Web.K] / span,
+                table[:, Web.FRICTION] / span)
+
+    def removeNode(self, index):
+        # The slot stays, but is never stepped again until reused
+        self.alive[index] = False
+        self.asleep[index] = True
+        self.fixed[index] = True
+        self.freeNodes.append(index)
+        self.topologyVersion += 1
+        self.version += 1
+
+    def removeSpring(self, index):
+        self.springAlive[index] = False
+        self.freeSprings.append(index)
+        self.topologyVersion += 1
+        self.version += 1
+
+    def liveSprings(self):
+        if self.liveVersion != self.topologyVersion:
+            self.live = np.flatnonzero(self.springAlive[:self.numSprings])
+            self.liveVersion = self.topologyVersion
+        return self.live
+
+    def addRope(self, rope):
+        self.ropes.append(rope)
+        return len(self.ropes) - 1
+
+    def splitSpring(self, spring, node):
+        # Rewire spring (a, b) into (a, node) plus a new spring (node, b).
+        # Costs O(1) amortized, nothing else in the web is touched.
+        i = spring.index
+        end = Node(self, self.springB[i].item())
+        self.springB[i] = node.index
+        return self.newSpring(node, end, self.springRope[i].item(),
+                              self.span[i], self.springMaterial[i])
+
+    def liveNodeCount(self):
+        return self.numNodes - len(self.freeNodes)
+
+    def liveSpringCount(self):
+        return self.numSprings - len(self.freeSprings)
+
+    def overBudget(self):
+        return (self.nodeBudget is not None and
+                self.liveNodeCount() > self.nodeBudget) or \
+            (self.springBudget is not None and
+             self.liveSpringCount() > self.springBudget)
+
+    def ropesToEvict(self, exclude=()):
+        # The strands to remove, oldest or least pulled on first, for the
+        # web to be back under evictTo of its budget. None of exclude are
+        # picked. Empty while the web is within budget.
+        if not self.overBudget():
+            return []
+        live = self.liveSprings()
+        ropeIds = self.springRope[live]
+        mine = ropeIds >= 0
+        count = np.bincount(ropeIds[mine], minlength=len(self.ropes))
+        if self.eviction == Web.LEAST_LOADED:
+            length, k, friction = self.springParameters(live)
+            a, b = self.springA[live], self.springB[live]
+            stretch = np.hypot(self.x[b] - self.x[a], self.y[b] - self.y[a])
+            tension = np.bincount(
+                ropeIds[mine], (k * np.maximum(stretch - length, 0))[mine],
+                len(self.ropes))
+            order = np.argsort(tension / np.maximum(count, 1),
+                               kind="stable")
+        else:
+            order = np.arange(len(self.ropes))
+        skip = set(id(rope) for rope in exclude)
+        # Each strand takes about one node per spring with it
+        excess = max(
+            0 if self.nodeBudget is None else
+            self.liveNodeCount() - int(self.nodeBudget * self.evictTo),
+            0 if self.springBudget is None else
+            self.liveSpringCount() - int(self.springBudget * self.evictTo))
+        ropes = []
+        for i in order[count[order] > 0].tolist():
+            if excess <= 0:
+                break
+            if id(self.ropes[i]) not in skip:
+                ropes.append(self.ropes[i])
+                excess -= count[i]
+        return ropes
+
+    def removeRopes(self, ropes):
+        # Remove every spring of ropes, and every node left without springs.
+        # Junctions shared with other strands stay as their plain nodes.
+        # Costs the size of ropes plus one adjacency build.
+        springs = np.concatenate([rope.springIndices for rope in ropes] +
+                                 [np.zeros(0, dtype=np.intp)])
+        ropeIds = np.array([rope.ropeId for rope in ropes], dtype=np.intp)
+        springs = np.unique(springs[self.springAlive[springs]])
+        springs = springs[np.isin(self.springRope[springs], ropeIds)]
+        degree = self.degree()
+        ends = np.concatenate([self.springA[springs], self.springB[springs]])
+        ends, lost = np.unique(ends, return_counts=True)
+        for i in springs.tolist():
+            self.removeSpring(i)
+        for i in ends[degree[ends] == lost].tolist():
+            self.removeNode(i)
+        for rope in ropes:
+            self.ropes[rope.ropeId] = None
+
+    def weld(self, drop, keep):
+        # Merge each node of drop into the node of keep at the same
+        # position, rewiring its springs and dropping the ones left with
+        # both ends on one node. keep must not itself be in drop.
+        drop, keep = np.asarray(drop, dtype=np.intp), \
+            np.asarray(keep, dtype=np.intp)
+        target = np.arange(self.numNodes)
+        target[drop] = keep
+        live = self.liveSprings()
+        touched = live[np.isin(self.springA[live], drop) |
+                       np.isin(self.springB[live], drop)]
+        # Ropes losing an inner node or a spring need their membership
+        # rebuilt; the rest only have an end move
+        a, b = self.springA[touched], self.springB[touched]
+        inA, inB = np.isin(a, drop), np.isin(b, drop)
+        ropes = self.springRope[touched] * self.numNodes
+        pairs, counts = np.unique(np.concatenate(
+            (ropes[inA] + a[inA], ropes[inB] + b[inB])), return_counts=True)
+        self.springA[live] = target[self.springA[live]]
+        self.springB[live] = target[self.springB[live]]
+        collapsed = touched[self.springA[touched] == self.springB[touched]]
+        for i in collapsed.tolist():
+            self.removeSpring(i)
+        rebuild = set(np.concatenate((pairs[counts > 1] // self.numNodes,
+                                      self.springRope[collapsed])).tolist())
+        # A free node takes the mass of the free nodes merged into it
+        free = ~self.fixed[drop] & ~self.fixed[keep]
+        np.add.at(self.mass, keep[free], self.mass[drop[free]])
+        np.logical_or.at(self.fixed, keep, self.fixed[drop])
+        np.logical_and.at(self.asleep, keep, self.asleep[drop])
+        for i in drop.tolist():
+            self.removeNode(i)
+        for ropeId in np.unique(self.springRope[touched]).tolist():
+            if ropeId < 0:
+                continue
+            rope = self.ropes[ropeId]
+            rope.startNode = Node(self, target[rope.startNode.index].item())
+            rope.endNode = Node(self, target[rope.endNode.index].item())
+            rope.chainDirty = True
+            if ropeId in rebuild:
+                rope.reindex()
+
+    def adjacency(self):
+        # CSR adjacency, rebuilt lazily after the topology changes: node i
+        # touches springs edgeSprings[indptr[i]:indptr[i + 1]], whose other
+        # ends are the same slice of neighbors.
+        if self.adjacencyVersion != self.topologyVersion:
+            n, live = self.numNodes, self.liveSprings()
+            a, b = self.springA[live], self.springB[live]
+            ends = np.concatenate((a, b))
+            order = np.argsort(ends, kind="stable")
+            self.indptr = np.zeros(n + 1, dtype=np.intp)
+            np.cumsum(np.bincount(ends, minlength=n), out=self.indptr[1:])
+            self.neighbors = np.concatenate((b, a))[order]
+            self.edgeSprings = np.concatenate((live, live))[order]
+            self.adjacencyVersion = self.topologyVersion
+        return self.indptr, self.neighbors, self.edgeSprings
+
+    def degree(self):
+        return np.diff(self.adjacency()[0])
+
+    def islands(self):
+        # Connected component of every node, rebuilt lazily after the
+        # topology changes. Labels are hooked onto the lowest label across
+        # each spring and then flattened by pointer jumping, which takes a
+        # few rounds rather than one per node along a strand.
+        if self.islandVersion != self.topologyVersion:
+            n, live = self.numNodes, self.liveSprings()
+            a, b = self.springA[live], self.springB[live]
+            labels = np.arange(n)
+            while True:
+                low = np.minimum(labels[a], labels[b])
+                np.minimum.at(labels, labels[a], low)
+                np.minimum.at(labels, labels[b], low)
+                jumped = labels[labels]
+                while (jumped != labels).any():
+                    labels = jumped
+                    jumped = labels[labels]
+                if (labels[a] == labels[b]).all():
+                    break
+            roots, self.island = np.unique(labels, return_inverse=True)
+            self.numIslands = len(roots)
+            # An island joined from sleeping and awake parts is awake
+            awake = np.bincount(self.island, ~self.asleep[:n],
+                                self.numIslands) > 0
+            self.asleep[:n] = ~awake[self.island]
+            self.awakeSteps = np.zeros(self.numIslands, dtype=int)
+            self.calmEnergy = np.zeros(self.numIslands)
+            self.sleepVersion += 1
+            self.islandVersion = self.topologyVersion
+        return self.island
+
+    @staticmethod
+    def colorSprings(a, b, n):
+        # Split springs into batches where no two springs share a node, so
+        # each batch can be relaxed at once without write conflicts. Every
+        # round keeps the springs that have the lowest random priority at
+        # both of their ends, which always makes progress.
+        left = np.arange(len(a))
+        priority = np.random.permutation(len(a))
+        colors = []
+        while len(left) > 0:
+            lowest = np.full(n, len(a))
+            np.minimum.at(lowest, a[left], priority[left])
+            np.minimum.at(lowest, b[left], priority[left])
+            chosen = ((lowest[a[left]] == priority[left]) &
+                      (lowest[b[left]] == priority[left]))
+            colors.append(left[chosen])
+            left = left[~chosen]
+        return colors
+
+    def awakeBatch(self):
+        # Every node of every awake island, or None when the whole web is
+        # asleep
+        self.islands()
+        if self.batchVersion != (self.topologyVersion, self.sleepVersion):
+            n = self.numNodes
+            awake = np.flatnonzero(~self.asleep[:n] & self.alive[:n])
+            self.batch = WebBatch(self, awake) if len(awake) > 0 else None
+            self.batchVersion = (self.topologyVersion, self.sleepVersion)
+        return self.batch
+
+    def isAsleep(self):
+        return self.awakeBatch() is None
+
+    def step(self):
+        batch = self.awakeBatch()
+        if batch is None:
+            return
+        self.stepCount += 1
+        # Fixed point webs always step everything at once at full rate, so
+        # where the view is can't change the result
+        if self.view is None or self.lodRate <= 1 or \
+                self.integrator == Web.FIXED:
+            self.stepAdaptive(batch)
+            return
+        visible, hidden = self.lodBatches(batch)
+        if visible is not None:
+            self.stepAdaptive(visible)
+        hidden = hidden[self.stepCount % self.lodRate]
+        if hidden is not None:
+            # Explicit Euler would blow up at the longer step
+            t = self.t * self.lodRate
+            integrator = Web.IMPLICIT if self.integrator == Web.EULER \
+                else self.integrator
+            self.stepBatch(hidden, t, integrator)
+            self.dampRunaways(hidden, t)
+            self.settle(hidden, t)
+
+    def splitBatch(self, batch, islandGroup, count):
+        # One batch per group of islands in batch, or None for an empty
+        # group. islandGroup gives every island a group in range(count).
+        group = islandGroup[batch.island]
+        batches = []
+        for i in range(count):
+            nodes = batch.nodes[group == i]
+            batches.append(WebBatch(self, nodes) if len(nodes) > 0 else None)
+        return batches
+
+    def lodBatches(self, batch):
+        # The islands of batch with a node in view as one batch, and the
+        # rest split by island into lodRate batches. Rebuilt only when an
+        # island crosses the edge of the view.
+        nodes = batch.nodes
+        x, y = self.x[nodes], self.y[nodes]
+        view = self.view
+        inside = (x >= view[0]) & (x <= view[0] + view[2]) & \
+            (y >= view[1]) & (y <= view[1] + view[3])
+        shown = np.bincount(batch.island, inside, self.numIslands) > 0
+        hidden = batch.islandIds[~shown[batch.islandIds]]
+        version = (self.batchVersion, self.lodRate, hidden.tobytes())
+        if self.lodVersion != version:
+            islandGroup = np.zeros(self.numIslands, dtype=np.intp)
+            islandGroup[hidden] = 1 + hidden % self.lodRate
+            batches = self.splitBatch(batch, islandGroup, self.lodRate + 1)
+            self.lodVisible, self.lodHidden = batches[0], batches[1:]
+            self.lodVersion = version
+        return self.lodVisible, self.lodHidden
+
+    def stepAdaptive(self, batch):
+        # Step batch once, except that with Euler the islands that need it
+        # take 2, 4 or more shorter substeps instead
+        levels = None
+        if self.integrator == Web.EULER and self.adaptive:
+            levels = self.substepLevels(batch)
+        if levels is None:
+            self.stepBatch(batch)
+            self.dampRunaways(batch, self.t)
+            self.settle(batch)
+            return
+        key = levels[batch.islandIds].tobytes()
+        if self.substepKey != (batch, key):
+            self.substepGroups = self.splitBatch(batch, levels,
+                                                 levels.max() + 1)
+            self.substepKey = (batch, key)
+        for level, group in enumerate(self.substepGroups):
+            if group is None:
+                continue
+            steps = 2**level
+            nodes = group.nodes
+            x, y = self.x[nodes], self.y[nodes]
+            for i in range(steps):
+                self.stepBatch(group, self.t / steps)
+                self.dampRunaways(group, self.t / steps)
+            self.settle(group, self.t / steps)
+            # Draw between where the whole step started and ended
+            self.xLast[nodes], self.yLast[nodes] = x, y
+
+    def substepLevels(self, batch):
+        # How many times each island of batch has to halve its step, or
+        # None when one step does everywhere. Stiffness comes from the
+        # springs at each node and error from the last step's forces, as
+        # half the acceleration times the step squared.
+        nodes, t = batch.nodes, self.t
+        mass = self.mass[nodes]
+        if batch.stiffness is None:
+            n = len(nodes)
+            length, k, friction = self.springParameters(batch.springs)
+            spring = np.bincount(batch.a, k, n) + np.bincount(batch.b, k, n)
+            damping = np.bincount(batch.a, friction, n) + \
+                np.bincount(batch.b, friction, n)
+            batch.stiffness = np.maximum(np.sqrt(spring / mass),
+                                         damping / mass) * t / self.stableStep
+        acceleration = np.hypot(self.xForce[nodes], self.yForce[nodes]) / mass
+        need = np.maximum(batch.stiffness, np.sqrt(
+            0.5 * acceleration * t * t / self.errorTolerance))
+        over = np.flatnonzero((need > 1) & batch.free)
+        if len(over) == 0:
+            return None
+        level = np.minimum(np.ceil(np.log2(need[over])),
+                           np.log2(self.maxSubsteps)).astype(np.intp)
+        levels = np.zeros(self.numIslands, dtype=np.intp)
+        np.maximum.at(levels, batch.island[over], level)
+        return levels
+
+    def dampRunaways(self, batch, t):
+        # Pull nodes that went faster than maxSpeed over the last step of
+        # length t back to that speed, in both where they moved to and
+        # their velocity, and put nodes thrown out to infinity back where
+        # they were
+        nodes = batch.nodes
+        xMove = self.x[nodes] - self.xLast[nodes]
+        yMove = self.y[nodes] - self.yLast[nodes]
+        xVel, yVel = self.xVel[nodes], self.yVel[nodes]
+        speed = np.maximum(np.hypot(xMove, yMove) / t, np.hypot(xVel, yVel))
+        fast = speed > self.maxSpeed
+        if not fast.any():
+            return
+        scale = self.maxSpeed / speed[fast]
+        scale[~np.isfinite(scale)] = 0
+        xMove, yMove = xMove[fast] * scale, yMove[fast] * scale
+        xMove[~np.isfinite(xMove)] = yMove[~np.isfinite(yMove)] = 0
+        nodes = nodes[fast]
+        self.x[nodes] = self.xLast[nodes] + xMove
+        self.y[nodes] = self.yLast[nodes] + yMove
+        self.xVel[nodes] = np.nan_to_num(xVel[fast] * scale)
+        self.yVel[nodes] = np.nan_to_num(yVel[fast] * scale)
+
+    def stepBatch(self, batch, t=None, integrator=None):
+        # t and integrator default to the web's own
+        if integrator is None:
+            integrator = self.integrator
+        if t is None:
+            t = self.t
+        if integrator == Web.VERLET:
+            self.stepVerlet(batch, t)
+        elif integrator == Web.IMPLICIT:
+            self.stepImplicit(batch, t)
+        elif integrator == Web.FIXED:
+            self.stepFixed(batch, t)
+        elif (self.workers is not None and t == self.t and
+              len(batch.nodes) >= self.parallelNodes):
+            self.workers.step(batch)
+        else:
+            self.stepEuler(batch, t)
+        self.version += 1
+
+    def startWorkers(self, numWorkers=None):
+        # Step large Euler webs in worker processes from now on
+        self.stopWorkers()
+        self.workers = WebWorkers(self, numWorkers)
+
+    def stopWorkers(self):
+        if self.workers is not None:
+            self.workers.close()
+            self.workers = None
+
+    def stepEuler(self, batch, t):
+        nodes, a, b, springs = batch.nodes, batch.a, batch.b, batch.springs
+        n = len(nodes)
+        x, y = self.x[nodes], self.y[nodes]
+        xVel, yVel = self.xVel[nodes], self.yVel[nodes]
+        mass = self.mass[nodes]
+        self.xLast[nodes] = x
+        self.yLast[nodes] = y
+        # Reset the forces to gravity and wind
+        yForce = self.gravity * mass
+        xForce = self.wind[nodes] * mass / Web.windMass
+        # Solve every spring at once
+        length, k, friction = self.springParameters(springs)
+        forceX, forceY = springForces(
+            x, y, xVel, yVel, a, b, length, k, friction)
+        yForce += np.bincount(b, forceY, n) - np.bincount(a, forceY, n)
+        xForce += np.bincount(b, forceX, n) - np.bincount(a, forceX, n)
+        moveNodes(x, y, xVel, yVel, xForce, yForce, mass, batch.free, t)
+        self.x[nodes], self.y[nodes] = x, y
+        self.xVel[nodes], self.yVel[nodes] = xVel, yVel
+        self.xForce[nodes], self.yForce[nodes] = xForce, yForce
+
+    def stepFixed(self, batch, t):
+        # Euler like stepEuler, but on int64 fixed point numbers with
+        # fixedScale as one. Every force is an integer and integer sums
+        # don't depend on their order, so the result is bit for bit the
+        # same however the web is ordered or split into batches, and on any
+        # machine. Fixed point values are exact as floats, so the web's
+        # arrays keep them between steps.
+        one = Web.fixedScale
+        nodes, a, b, springs = batch.nodes, batch.a, batch.b, batch.springs
+        n = len(nodes)
+
+        def fixed(values):
+            return np.round(np.asarray(values) * one).astype(np.int64)
+        x, y = fixed(self.x[nodes]), fixed(self.y[nodes])
+        xVel, yVel = fixed(self.xVel[nodes]), fixed(self.yVel[nodes])
+        mass = fixed(self.mass[nodes])
+        step = int(fixed(t))
+        length, k, friction = [fixed(values) for values in
+                               self.springParameters(springs)]
+        self.xLast[nodes] = self.x[nodes]
+        self.yLast[nodes] = self.y[nodes]
+        # Spring forces on each b end, as in springForces
+        xLength, yLength = x[b] - x[a], y[b] - y[a]
+        vector = integerSqrt(xLength * xLength + yLength * yLength)
+        stretched = vector > 0
+        safe = np.where(stretched, vector, 1)
+        pull = (vector - length) * k >> 16
+        xUnit, yUnit = (xLength << 16) // safe, (yLength << 16) // safe
+        forceX = np.where(stretched, -(xUnit * pull >> 16) +
+                          ((xVel[a] - xVel[b]) * friction >> 16), 0)
+        forceY = np.where(stretched, -(yUnit * pull >> 16) +
+                          ((yVel[a] - yVel[b]) * friction >> 16), 0)
+        xForce = fixed(self.wind[nodes]) * mass // (Web.windMass * one)
+        yForce = fixed(self.gravity) * mass >> 16
+        np.add.at(xForce, b, forceX)
+        np.subtract.at(xForce, a, forceX)
+        np.add.at(yForce, b, forceY)
+        np.subtract.at(yForce, a, forceY)
+        # Move free nodes, truncating to whole pixels like moveNodes
+        free = batch.free
+        for position, velocity, force in ((x, xVel, xForce),
+                                          (y, yVel, yForce)):
+            velocity[free] += ((force[free] << 16) // mass[free]) * step >> 16
+            move = velocity[free] * step >> 16
+            position[free] += np.sign(move) * (np.abs(move) >> 16 << 16)
+        self.x[nodes], self.y[nodes] = x / one, y / one
+        self.xVel[nodes], self.yVel[nodes] = xVel / one, yVel / one
+        self.xForce[nodes], self.yForce[nodes] = xForce / one, yForce / one
+
+    def stepImplicit(self, batch, h):
+        # Backward Euler, linearised once per step:
+        #     (M + h * friction + h^2 * stiffness) dv = h f - h^2 stiffness v
+        # Strands without junctions are block tridiagonal and solved in
+        # O(n) as banded chains; islands with junctions go through a
+        # matrix-free conjugate gradient. Stable for any timestep, so stiff
+        # springs no longer force tiny ones.
+        nodes, a, b, springs = batch.nodes, batch.a, batch.b, batch.springs
+        n = len(nodes)
+        x, y = self.x[nodes], self.y[nodes]
+        xVel, yVel = self.xVel[nodes], self.yVel[nodes]
+        mass = self.mass[nodes]
+        self.xLast[nodes] = x
+        self.yLast[nodes] = y
+        length, k, friction = self.springParameters(springs)
+        forceX, forceY = springForces(
+            x, y, xVel, yVel, a, b, length, k, friction)
+        xForce = self.wind[nodes] * mass / Web.windMass + \
+            np.bincount(b, forceX, n) - np.bincount(a, forceX, n)
+        yForce = self.gravity * mass + \
+            np.bincount(b, forceY, n) - np.bincount(a, forceY, n)
+        # Each spring couples its ends by the 2x2 block
+        #     h * friction * I + h^2 * k * (c * I + (1 - c) * u u^T)
+        # where u is the spring direction and c = 1 - rest / length,
+        # clamped at 0 so squashed springs never make the system indefinite
+        xLength, yLength = x[b] - x[a], y[b] - y[a]
+        vector = np.hypot(xLength, yLength)
+        safe = np.where(vector > 0, vector, 1)
+        xUnit, yUnit = xLength / safe, yLength / safe
+        c = np.clip(1 - length / safe, 0, 1)
+        stiffness = k * h * h
+        sxx = stiffness * (c + (1 - c) * xUnit * xUnit)
+        sxy = stiffness * (1 - c) * xUnit * yUnit
+        syy = stiffness * (c + (1 - c) * yUnit * yUnit)
+        damping = friction * h
+        bxx, bxy, byy = sxx + damping, sxy, syy + damping
+        xSlip, ySlip = xVel[a] - xVel[b], yVel[a] - yVel[b]
+        xPull = sxx * xSlip + sxy * ySlip
+        yPull = sxy * xSlip + syy * ySlip
+        xRight = h * xForce - np.bincount(a, xPull, n) + \
+            np.bincount(b, xPull, n)
+        yRight = h * yForce - np.bincount(a, yPull, n) + \
+            np.bincount(b, yPull, n)
+        dxx = mass + np.bincount(a, bxx, n) + np.bincount(b, bxx, n)
+        dxy = np.bincount(a, bxy, n) + np.bincount(b, bxy, n)
+        dyy = mass + np.bincount(a, byy, n) + np.bincount(b, byy, n)
+        xChange, yChange = np.zeros(n), np.zeros(n)
+        chainNodes, chainSprings, tangledNodes, tangledSprings = \
+            batch.implicitLayout(self)
+        if len(chainNodes) > 0:
+            # One row per position along the chains; padding solves to 0
+            rows, springRows = chainNodes.T, chainSprings.T
+            pad, gap = rows < 0, springRows < 0
+            cross = np.where(pad, 0, dxy[rows])
+            diagonal = (np.where(pad, 1, dxx[rows]), cross, cross,
+                        np.where(pad, 1, dyy[rows]))
+            cross = np.where(gap, 0, -bxy[springRows])
+            upper = (np.where(gap, 0, -bxx[springRows]), cross, cross,
+                     np.where(gap, 0, -byy[springRows]))
+            right = (np.where(pad, 0, xRight[rows]),
+                     np.where(pad, 0, yRight[rows]))
+            xAnswer, yAnswer = solveBlockTridiagonal(diagonal, upper, right)
+            xChange[rows[~pad]] = xAnswer[~pad]
+            yChange[rows[~pad]] = yAnswer[~pad]
+        if len(tangledNodes) > 0:
+            ta, tb = a[tangledSprings], b[tangledSprings]
+            txx, txy = bxx[tangledSprings], bxy[tangledSprings]
+            tyy = byy[tangledSprings]
+            unknown = np.zeros(n)
+            unknown[tangledNodes] = 1
+
+            def apply(px, py):
+                xSlip, ySlip = px[ta] - px[tb], py[ta] - py[tb]
+                qx = txx * xSlip + txy * ySlip
+                qy = txy * xSlip + tyy * ySlip
+                return ((mass * px + np.bincount(ta, qx, n) -
+                         np.bincount(tb, qx, n)) * unknown,
+                        (mass * py + np.bincount(ta, qy, n) -
+                         np.bincount(tb, qy, n)) * unknown)
+            # Block Jacobi preconditioner
+            determinant = dxx * dyy - dxy * dxy
+
+            def precondition(rx, ry):
+                return ((dyy * rx - dxy * ry) / determinant,
+                        (dxx * ry - dxy * rx) / determinant)
+            rx, ry = xRight * unknown, yRight * unknown
+            zx, zy = precondition(rx, ry)
+            px, py = zx, zy
+            rz = np.dot(rx, zx) + np.dot(ry, zy)
+            goal = self.solverTolerance * (np.dot(rx, rx) + np.dot(ry, ry))
+            for iteration in range(self.solverIterations):
+                if np.dot(rx, rx) + np.dot(ry, ry) <= goal:
+                    break
+                qx, qy = apply(px, py)
+                step = rz / (np.dot(px, qx) + np.dot(py, qy))
+                xChange += step * px
+                yChange += step * py
+                rx, ry = rx - step * qx, ry - step * qy
+                zx, zy = precondition(rx, ry)
+                rzNext = np.dot(rx, zx) + np.dot(ry, zy)
+                px = zx + (rzNext / rz) * px
+                py = zy + (rzNext / rz) * py
+                rz = rzNext
+        free = batch.free
+        xVel[free] += xChange[free]
+        yVel[free] += yChange[free]
+        x[free] += xVel[free] * h
+        y[free] += yVel[free] * h
+        self.x[nodes], self.y[nodes] = x, y
+        self.xVel[nodes], self.yVel[nodes] = xVel, yVel
+        self.xForce[nodes], self.yForce[nodes] = xForce, yForce
+
+    def stepVerlet(self, batch, t):
+        # Position based dynamics: move every node by its implied velocity
+        # and the external forces, then pull the springs back towards their
+        # rest length. Each spring is a compliant constraint (XPBD) with
+        # compliance 1 / k, which settles where the force based spring would
+        # but stays stable at several times the Euler timestep.
+        nodes, springs = batch.nodes, batch.springs
+        x, y = self.x[nodes], self.y[nodes]
+        free = batch.free
+        inverseMass = np.where(free, 1 / self.mass[nodes], 0)
+        # Where the last step's velocity says the nodes were t ago, so the
+        # step length can change between steps
+        xOld = x - self.xVel[nodes] * t
+        yOld = y - self.yVel[nodes] * t
+        self.xLast[nodes] = x
+        self.yLast[nodes] = y
+        x[free] += ((x[free] - xOld[free]) * self.damping +
+                    self.wind[nodes][free] / Web.windMass * t * t)
+        y[free] += (y[free] - yOld[free]) * self.damping + \
+            self.gravity * t * t
+        length, k, friction = self.springParameters(springs)
+        compliance = 1 / (k * t * t)
+        lambdas = np.zeros(len(springs))
+        colors = [(color, batch.a[color], batch.b[color])
+                  for color in batch.colors()]
+        for iteration in range(self.iterations):
+            for color, a, b in colors:
+                xLength = x[b] - x[a]
+                yLength = y[b] - y[a]
+                vector = np.hypot(xLength, yLength)
+                safe = np.where(vector > 0, vector, 1)
+                weight = inverseMass[a] + inverseMass[b] + compliance[color]
+                delta = (-(vector - length[color]) -
+                         compliance[color] * lambdas[color]) / weight
+                lambdas[color] += delta
+                x[a] -= inverseMass[a] * delta * xLength / safe
+                y[a] -= inverseMass[a] * delta * yLength / safe
+                x[b] += inverseMass[b] * delta * xLength / safe
+                y[b] += inverseMass[b] * delta * yLength / safe
+        self.x[nodes], self.y[nodes] = x, y
+        self.xVel[nodes] = (x - self.xLast[nodes]) / t
+        self.yVel[nodes] = (y - self.yLast[nodes]) / t
+
+    def settle(self, batch, t=None):
+        # Add up the kinetic energy of each island in batch and put it to
+        # sleep if it stayed low over its last sleepSteps steps. Energy
+        # comes from how far nodes actually moved, since truncated Euler
+        # positions can sit still while their velocity creeps up.
+        nodes, ids = batch.nodes, batch.islandIds
+        t = self.t if t is None else t
+        energy = 0.5 * self.mass[nodes] * batch.free * \
+            ((self.x[nodes] - self.xLast[nodes])**2 +
+             (self.y[nodes] - self.yLast[nodes])**2) / t**2
+        total = np.bincount(batch.island, energy, self.numIslands)
+        self.calmEnergy[ids] += total[ids] / \
+            np.maximum(batch.islandSize[ids], 1)
+        self.awakeSteps[ids] += 1
+        due = ids[self.awakeSteps[ids] % self.sleepSteps == 0]
+        if len(due) > 0:
+            sleepy = due[self.calmEnergy[due] <=
+                         self.sleepEnergy * self.sleepSteps]
+            self.calmEnergy[due] = 0
+            if len(sleepy) > 0:
+                self.sleepIslands(sleepy)
+
+    def sleepIslands(self, islands):
+        nodes = np.flatnonzero(np.isin(self.island, islands))
+        self.asleep[nodes] = True
+        self.xVel[nodes] = self.yVel[nodes] = 0
+        self.xLast[nodes], self.yLast[nodes] = self.x[nodes], self.y[nodes]
+        self.restWind[nodes] = self.wind[nodes]
+        self.sleepVersion += 1
+
+    def wakeNodes(self, nodes):
+        # Wake every island that one of nodes belongs to
+        island = self.islands()
+        nodes = nodes[self.asleep[nodes]]
+        if len(nodes) > 0:
+            islands = np.unique(island[nodes])
+            self.asleep[:self.numNodes][np.isin(island, islands)] = False
+            self.awakeSteps[islands] = 0
+            self.calmEnergy[islands] = 0
+            self.sleepVersion += 1
+
+    def ropesNear(self, x, y, radius):
+        live = self.liveSprings()
+        a, b = self.springA[live], self.springB[live]
+        near = np.hypot((self.x[a] + self.x[b]) / 2 - x,
+                        (self.y[a] + self.y[b]) / 2 - y) <= radius
+        return [self.ropes[i] for i in np.unique(self.springRope[live[near]])
+                if i >= 0]
+
+    def wakeNear(self, x, y, radius):
+        n = self.numNodes
+        near = (np.hypot(self.x[:n] - x, self.y[:n] - y) <= radius) & \
+            self.alive[:n]
+        self.wakeNodes(np.flatnonzero(near))
+
+    def setWind(self, nodes, force):
+        # Wind that strays far enough from what a sleeping node settled in
+        # wakes its island
+        self.wind[nodes] = force
+        moved = np.abs(self.restWind[nodes] - force) > self.wakeWind
+        if moved.any():
+            self.wakeNodes(nodes[moved])
+
+    def moveFixed(self, nodes, x, y):
+        # Carry fixed nodes to x and y, as when what they are tied to moves
+        self.x[nodes], self.y[nodes] = x, y
+        asleep = nodes[self.asleep[nodes]]
+        moved = np.hypot(self.x[asleep] - self.xLast[asleep],
+                         self.y[asleep] - self.yLast[asleep]) > self.wakeMove
+        if moved.any():
+            self.wakeNodes(asleep[moved])
+        self.version += 1
+
+    def positions(self, nodes, alpha=1.0):
+        # Positions of nodes blended alpha of the way through the last step
+        x, y = self.x[nodes], self.y[nodes]
+        if alpha < 1:
+            x = self.xLast[nodes] + (x - self.xLast[nodes]) * alpha
+            y = self.yLast[nodes] + (y - self.yLast[nodes]) * alpha
+        return x, y
+
+
+class WebWorkers(object):
+    # Steps a WebBatch across worker processes. Each worker owns one part
+    # of the nodes and the springs starting in it, and every array lives in
+    # shared memory so a step only passes through three barriers: springs
+    # are solved, then each worker sums the forces on its own nodes (reading
+    # boundary springs solved by its neighbours) and moves them. Parts are
+    # whole islands when they balance, otherwise slabs along x.
+    # Commands
+    STOP = 0
+    LOAD = 1
+    STEP = 2
+
+    def __init__(self, web, numWorkers=None):
+        self.web = web
+        self.numWorkers = numWorkers or multiprocessing.cpu_count()
+        self.batch = None
+        self.memory = []
+        context = multiprocessing.get_context()
+        self.barrier = context.Barrier(self.numWorkers + 1)
+        self.controlMemory, self.control = sharedArray(4, np.float64)
+        self.pipes = []
+        self.processes = []
+        for rank in range(self.numWorkers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=webWorker, daemon=True,
+                args=(rank, child, self.barrier, self.controlMemory.name))
+            process.start()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def partition(self, batch):
+        # Which worker owns each node of batch
+        workers = self.numWorkers
+        size = np.bincount(batch.island)[batch.islandIds]
+        if size.max() * workers <= 1.5 * size.sum():
+            # Greedily hand the biggest islands to the emptiest worker
+            owner = np.zeros(len(size), dtype=np.intp)
+            load = np.zeros(workers)
+            for i in np.argsort(-size):
+                owner[i] = np.argmin(load)
+                load[owner[i]] += size[i]
+            return owner[np.searchsorted(batch.islandIds, batch.island)]
+        order = np.argsort(self.web.x[batch.nodes], kind="stable")
+        part = np.empty(len(order), dtype=np.intp)
+        part[order] = np.arange(len(order)) * workers // len(order)
+        return part
+
+    def load(self, batch):
+        # Lay batch out in shared memory, grouped by owner, and hand every
+        # worker the names of the blocks
+        self.release()
+        web = self.web
+        part = self.partition(batch)
+        order = np.argsort(part, kind="stable")
+        self.nodes = batch.nodes[order]
+        local = np.empty(len(order), dtype=np.intp)
+        local[order] = np.arange(len(order))
+        a, b = local[batch.a], local[batch.b]
+        springOrder = np.argsort(part[order][a], kind="stable")
+        a, b = a[springOrder], b[springOrder]
+        springs = batch.springs[springOrder]
+        nodeStarts = np.searchsorted(part[order], np.arange(
+            self.numWorkers + 1))
+        springStarts = np.searchsorted(part[order][a], np.arange(
+            self.numWorkers + 1))
+        # Every spring end, grouped by the worker owning the node
+        ends = np.concatenate((a, b))
+        endOrder = np.argsort(ends, kind="stable")
+        edgeNode = ends[endOrder]
+        edgeSpring = np.concatenate((np.arange(len(a)),
+                                     np.arange(len(a))))[endOrder]
+        edgeSign = np.concatenate((-np.ones(len(a)),
+                                   np.ones(len(a))))[endOrder]
+        edgeStarts = np.searchsorted(edgeNode, nodeStarts)
+        length, k, friction = web.springParameters(springs)
+        arrays = {
+            "x": web.x[self.nodes], "y": web.y[self.nodes],
+            "xVel": web.xVel[self.nodes], "yVel": web.yVel[self.nodes],
+            "wind": web.wind[self.nodes], "mass": web.mass[self.nodes],
+            "free": ~web.fixed[self.nodes],
+            "a": a, "b": b, "length": length, "k": k, "friction": friction,
+            "forceX": np.zeros(len(a)), "forceY": np.zeros(len(a)),
+            "edgeNode": edgeNode, "edgeSpring": edgeSpring,
+            "edgeSign": edgeSign, "nodeStarts": nodeStarts,
+            "springStarts": springStarts, "edgeStarts": edgeStarts}
+        names = {}
+        self.shared = {}
+        for name, array in arrays.items():
+            memory, shared = sharedArray(len(array), array.dtype)
+            shared[:] = array
+            self.memory.append(memory)
+            self.shared[name] = shared
+            names[name] = (memory.name, array.dtype.str, len(array))
+        for pipe in self.pipes:
+            pipe.send(names)
+        self.control[0] = WebWorkers.LOAD
+        self.barrier.wait()
+        self.barrier.wait()
+        self.batch = batch
+
+    def step(self, batch, steps=1):
+        if batch is not self.batch:
+            self.load(batch)
+        web, nodes, shared = self.web, self.nodes, self.shared
+        web.xLast[nodes], web.yLast[nodes] = web.x[nodes], web.y[nodes]
+        # Positions and wind may have been changed from outside
+        for name in ("x", "y", "xVel", "yVel", "wind"):
+            shared[name][:] = getattr(web, name)[nodes]
+        self.control[:] = (WebWorkers.STEP, steps, web.t, web.gravity)
+        self.barrier.wait()
+        for i in range(steps):
+            self.barrier.wait()
+            self.barrier.wait()
+        for name in ("x", "y", "xVel", "yVel"):
+            getattr(web, name)[nodes] = shared[name]
+
+    def release(self):
+        for memory in self.memory:
+            memory.close()
+            memory.unlink()
+        self.memory = []
+        self.batch = None
+
+    def close(self):
+        self.control[0] = WebWorkers.STOP
+        self.barrier.wait()
+        for process in self.processes:
+            process.join()
+        self.release()
+        self.controlMemory.close()
+        self.controlMemory.unlink()
+
+
+def sharedArray(length, dtype):
+    dtype = np.dtype(dtype)
+    memory = shared_memory.SharedMemory(
+        create=True, size=max(1, length * dtype.itemsize))
+    return memory, np.ndarray(length, dtype, memory.buf)
+
+
+def webWorker(rank, pipe, barrier, controlName):
+    # Body of a WebWorkers process
+    controlMemory = shared_memory.SharedMemory(controlName)
+    control = np.ndarray(4, np.float64, controlMemory.buf)
+    memory = []
+    while True:
+        barrier.wait()
+        command = control[0]
+        if command == WebWorkers.STOP:
+            break
+        elif command == WebWorkers.LOAD:
+            for block in memory:
+                block.close()
+            memory, arrays = [], {}
+            for name, (blockName, dtype, length) in pipe.recv().items():
+                block = shared_memory.SharedMemory(blockName)
+                memory.append(block)
+                arrays[name] = np.ndarray(length, dtype, block.buf)
+            n0, n1 = arrays["nodeStarts"][rank:rank + 2]
+            s0, s1 = arrays["springStarts"][rank:rank + 2]
+            e0, e1 = arrays["edgeStarts"][rank:rank + 2]
+            edgeNode = arrays["edgeNode"][e0:e1] - n0
+            edgeSpring = arrays["edgeSpring"][e0:e1]
+            edgeSign = arrays["edgeSign"][e0:e1]
+            barrier.wait()
+        elif command == WebWorkers.STEP:
+            x, y = arrays["x"], arrays["y"]
+            xVel, yVel = arrays["xVel"], arrays["yVel"]
+            forceX, forceY = arrays["forceX"], arrays["forceY"]
+            a, b = arrays["a"][s0:s1], arrays["b"][s0:s1]
+            mass = arrays["mass"][n0:n1]
+            t, gravity = control[2], control[3]
+            for i in range(int(control[1])):
+                forceX[s0:s1], forceY[s0:s1] = springForces(
+                    x, y, xVel, yVel, a, b, arrays["length"][s0:s1],
+                    arrays["k"][s0:s1], arrays["friction"][s0:s1])
+                barrier.wait()
+                xForce = arrays["wind"][n0:n1] * mass / Web.windMass
+                xForce += np.bincount(
+                    edgeNode, edgeSign * forceX[edgeSpring], n1 - n0)
+                yForce = gravity * mass + np.bincount(
+                    edgeNode, edgeSign * forceY[edgeSpring], n1 - n0)
+                moveNodes(x[n0:n1], y[n0:n1], xVel[n0:n1], yVel[n0:n1],
+                          xForce, yForce, mass, arrays["free"][n0:n1], t)
+                barrier.wait()
+    for block in memory:
+        block.close()
+    controlMemory.close()
+
+
+class WebBatch(object):
+    # A set of web nodes and every spring between them, stepped together.
+    # a and b give each spring's ends as positions in nodes.
+
+    def __init__(self, web, nodes):
+        self.nodes = nodes
+        local = np.full(web.numNodes, -1, dtype=np.intp)
+        local[nodes] = np.arange(len(nodes))
+        live = web.liveSprings()
+        a, b = local[web.springA[live]], local[web.springB[live]]
+        inside = (a >= 0) & (b >= 0)
+        self.springs = live[inside]
+        self.a, self.b = a[inside], b[inside]
+        self.free = ~web.fixed[nodes]
+        self.island = web.islands()[nodes]
+        self.islandIds = np.unique(self.island)
+        self.islandSize = np.bincount(self.island, self.free, web.numIslands)
+        self.colorList = None
+        self.layout = None
+        # Per node substep need from stiffness, see Web.substepLevels
+        self.stiffness = None
+
+    def colors(self):
+        if self.colorList is None:
+            self.colorList = Web.colorSprings(self.a, self.b, len(self.nodes))
+        return self.colorList
+
+    def implicitLayout(self, web):
+        # For the implicit integrator: every strand that shares no free
+        # node with another as a padded row of its free nodes and the
+        # springs between them, plus the nodes and springs of the islands
+        # that do have junctions
+        if self.layout is None:
+            junction = self.free & (web.degree()[self.nodes] > 2)
+            tangled = np.isin(self.island, self.island[junction])
+            local = np.full(web.numNodes, -1, dtype=np.intp)
+            local[self.nodes] = np.arange(len(self.nodes))
+            localSpring = np.full(web.numSprings, -1, dtype=np.intp)
+            localSpring[self.springs] = np.arange(len(self.springs))
+            ropeIds = np.unique(web.springRope[self.springs[~tangled[self.a]]])
+            chains = [web.ropes[i].chain() for i in ropeIds if i >= 0]
+            longest = max([len(nodes) - 2 for nodes, springs in chains] +
+                          [1])
+            chainNodes = np.full((len(chains), longest), -1, dtype=np.intp)
+            chainSprings = np.full((len(chains), longest - 1), -1,
+                                   dtype=np.intp)
+            for i, (nodes, springs) in enumerate(chains):
+                chainNodes[i, :len(nodes) - 2] = local[nodes[1:-1]]
+                inner = springs[1:-1]
+                chainSprings[i, :len(inner)] = localSpring[inner]
+            self.layout = (chainNodes, chainSprings,
+                           np.flatnonzero(tangled & self.free),
+                           np.flatnonzero(tangled[self.a]))
+        return self.layout
+
+
+class WebGrid(object):
+    # Uniform grid hash of every live spring as a segment, for finding
+    # which strands something is touching without reading pixels. Each
+    # spring is filed under every cell of its bounding box; the cells are
+    # kept as one sorted key array so a lookup is a binary search.
+
+    def __init__(self, cellSize=16):
+        self.cellSize = cellSize
+        self.version = None
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.entries = np.zeros(0, dtype=np.intp)
+        self.springs = np.zeros(0, dtype=np.intp)
+        self.x0 = self.y0 = self.x1 = self.y1 = np.zeros(0)
+
+    @staticmethod
+    def cellKeys(column, row):
+        column, row = column.astype(np.int64), row.astype(np.int64)
+        return (row << 32) + column + (1 << 31)
+
+    def boxCells(self, x0, y0, x1, y1, margin=0):
+        # Key of every cell overlapped by each box, and which box it is for
+        size = self.cellSize
+        left = np.floor((np.minimum(x0, x1) - margin) / size)
+        right = np.floor((np.maximum(x0, x1) + margin) / size)
+        top = np.floor((np.minimum(y0, y1) - margin) / size)
+        bottom = np.floor((np.maximum(y0, y1) + margin) / size)
+        width = (right - left + 1).astype(np.intp)
+        cells = width * (bottom - top + 1).astype(np.intp)
+        boxes = np.repeat(np.arange(len(cells)), cells)
+        offset = np.arange(len(boxes)) - \
+            np.repeat(np.cumsum(cells) - cells, cells)
+        column = left[boxes] + offset % width[boxes]
+        row = top[boxes] + offset // width[boxes]
+        return WebGrid.cellKeys(column, row), boxes
+
+    def lineCells(self, x0, y0, x1, y1):
+        # Key of every cell the segment from (x0, y0) to (x1, y1) passes
+        # through, one run of rows per column, so a long strand costs its
+        # length in cells rather than its bounding box
+        size = self.cellSize
+        left, right = min(x0, x1), max(x0, x1)
+        columns = np.arange(math.floor(left / size),
+                            math.floor(right / size) + 1)
+        if x1 == x0:
+            low = np.array([float(min(y0, y1))])
+            high = np.array([float(max(y0, y1))])
+        else:
+            enter = np.clip(columns * size, left, right)
+            leave = np.clip((columns + 1) * size, left, right)
+            slope = (y1 - y0) / (x1 - x0)
+            low = np.minimum(y0 + (enter - x0) * slope,
+                             y0 + (leave - x0) * slope)
+            high = np.maximum(y0 + (enter - x0) * slope,
+                              y0 + (leave - x0) * slope)
+        top = np.floor(low / size)
+        rows = (np.floor(high / size) - top + 1).astype(np.intp)
+        owner = np.repeat(np.arange(len(columns)), rows)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(rows) - rows,
+                                                   rows)
+        return WebGrid.cellKeys(columns[owner], top[owner] + offset)
+
+    def filed(self, keys):
+        # Positions in the spring arrays filed under each of keys, one run
+        # per key, and how long each run is
+        starts = np.searchsorted(self.keys, keys, "left")
+        counts = np.searchsorted(self.keys, keys, "right") - starts
+        found = np.repeat(starts - np.cumsum(counts) + counts, counts) + \
+            np.arange(counts.sum())
+        return self.entries[found], counts
+
+    def add(self, web, springs):
+        # File springs that were made since the last update, so strands
+        # added in between are found without rebuilding the whole grid.
+        # Entries of springs that were rewired meanwhile only go stale, and
+        # crossings checks the live geometry anyway.
+        springs = np.asarray(springs, dtype=np.intp)
+        a, b = web.springA[springs], web.springB[springs]
+        first = len(self.springs)
+        self.springs = np.concatenate((self.springs, springs))
+        self.x0 = np.concatenate((self.x0, web.x[a]))
+        self.y0 = np.concatenate((self.y0, web.y[a]))
+        self.x1 = np.concatenate((self.x1, web.x[b]))
+        self.y1 = np.concatenate((self.y1, web.y[b]))
+        keys, entries = self.boxCells(web.x[a], web.y[a], web.x[b], web.y[b])
+        order = np.argsort(keys, kind="stable")
+        keys, entries = keys[order], entries[order] + first
+        places = np.searchsorted(self.keys, keys)
+        self.keys = np.insert(self.keys, places, keys)
+        self.entries = np.insert(self.entries, places, entries)
+
+    def crossings(self, web, x0, y0, x1, y1):
+        # Every live spring crossing the segment from (x0, y0) to (x1, y1),
+        # as (spring, x, y) in order from (x0, y0). Only the cells along the
+        # segment are looked at.
+        if len(self.keys) == 0:
+            return []
+        springs = np.unique(self.springs[self.filed(
+            self.lineCells(x0, y0, x1, y1))[0]])
+        springs = springs[web.springAlive[springs]]
+        a, b = web.springA[springs], web.springB[springs]
+        xPath, yPath = x1 - x0, y1 - y0
+        xLength, yLength = web.x[b] - web.x[a], web.y[b] - web.y[a]
+        xGap, yGap = web.x[a] - x0, web.y[a] - y0
+        denominator = xPath * yLength - yPath * xLength
+        safe = np.where(denominator != 0, denominator, 1)
+        along = (xGap * yLength - yGap * xLength) / safe
+        across = (xGap * yPath - yGap * xPath) / safe
+        cross = (denominator != 0) & (along > 0) & (along < 1) & \
+            (across > 0) & (across < 1)
+        order = np.argsort(along[cross])
+        return list(zip(springs[cross][order].tolist(),
+                        (x0 + along[cross] * xPath)[order].tolist(),
+                        (y0 + along[cross] * yPath)[order].tolist()))
+
+    def update(self, web):
+        # Rebuild from the web's current positions, only if anything moved
+        if self.version == web.version:
+            return
+        self.version = web.version
+        live = web.liveSprings()
+        a, b = web.springA[live], web.springB[live]
+        self.springs = live
+        self.x0, self.y0 = web.x[a], web.y[a]
+        self.x1, self.y1 = web.x[b], web.y[b]
+        keys, entries = self.boxCells(self.x0, self.y0, self.x1, self.y1)
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.entries = keys[order], entries[order]
+
+    def touching(self, x0, y0, x1, y1, radius):
+        # For each path from (x0, y0) to (x1, y1), whether it passes within
+        # radius of any strand. All paths are checked in one go.
+        x0, y0 = np.atleast_1d(x0), np.atleast_1d(y0)
+        x1, y1 = np.atleast_1d(x1), np.atleast_1d(y1)
+        keys, paths = self.boxCells(x0, y0, x1, y1, radius)
+        near, counts = self.filed(keys)
+        paths = np.repeat(paths, counts)
+        distance = segmentDistance(
+            x0[paths], y0[paths], x1[paths], y1[paths], self.x0[near],
+            self.y0[near], self.x1[near], self.y1[near])
+        return np.bincount(paths[distance <= radius], minlength=len(x0)) > 0
+
+
+class WebContacts(object):
+    # Contact between strands that touch after they were made. Spring
+    # bounding boxes are kept sorted by their left edge between calls, so
+    # re-sorting them is close to linear while the web only moves a little,
+    # and pairs are found by sweeping along that order. Springs of
+    # different ropes that pass through each other join at a new junction,
+    # or springs that touch push apart.
+    STICK = 0
+    REPEL = 1
+
+    def __init__(self, mode=STICK, thickness=3):
+        self.mode = mode
+        # Strands closer than thickness are touching
+        self.thickness = thickness
+        self.order = np.zeros(0, dtype=np.intp)
+        self.joined = set()
+        self.joinedVersion = None
+
+    def sweep(self, web):
+        # Live springs sorted by the left edge of their boxes, from last
+        # call's order plus any new springs at the end
+        live = web.liveSprings()
+        alive = np.zeros(web.numSprings, dtype=bool)
+        alive[live] = True
+        order = self.order[alive[self.order]]
+        known = np.zeros(web.numSprings, dtype=bool)
+        known[order] = True
+        order = np.concatenate([order, live[~known[live]]])
+        a, b = web.springA[order], web.springB[order]
+        left = np.minimum(web.x[a], web.x[b])
+        # Timsort runs through an almost sorted array in linear time
+        self.order = order[np.argsort(left, kind="stable")]
+        return self.order
+
+    def pairs(self, web):
+        # Every pair of springs of different ropes that might touch, as two
+        # spring index arrays
+        order = self.sweep(web)
+        a, b = web.springA[order], web.springB[order]
+        ax, ay, bx, by = web.x[a], web.y[a], web.x[b], web.y[b]
+        pad = self.thickness
+        left = np.minimum(ax, bx)
+        right = np.maximum(ax, bx) + pad
+        end = np.searchsorted(left, right, side="right")
+        counts = end - np.arange(1, len(order) + 1)
+        first = np.repeat(np.arange(len(order)), counts)
+        second = np.arange(len(first)) - np.repeat(
+            np.cumsum(counts) - counts, counts) + first + 1
+        top, bottom = np.minimum(ay, by), np.maximum(ay, by)
+        keep = (top[first] <= bottom[second] + pad) & \
+            (top[second] <= bottom[first] + pad)
+        first, second = first[keep], second[keep]
+        # Springs of one rope and springs sharing a node never touch
+        keep = (web.springRope[order[first]] !=
+                web.springRope[order[second]]) & \
+            (a[first] != a[second]) & (a[first] != b[second]) & \
+            (b[first] != a[second]) & (b[first] != b[second])
+        first, second = order[first[keep]], order[second[keep]]
+        asleep = web.asleep[web.springA[first]] & \
+            web.asleep[web.springA[second]]
+        return first[~asleep], second[~asleep]
+
+    def touching(self, web, first, second):
+        # The pairs of springs closer than thickness, with where along each
+        # they are closest
+        a, b = web.springA[first], web.springB[first]
+        c, d = web.springA[second], web.springB[second]
+        s, u = closestSegmentPoints(web.x[a], web.y[a], web.x[b], web.y[b],
+                                    web.x[c], web.y[c], web.x[d], web.y[d])
+        xGap = web.x[a] + s * (web.x[b] - web.x[a]) - \
+            (web.x[c] + u * (web.x[d] - web.x[c]))
+        yGap = web.y[a] + s * (web.y[b] - web.y[a]) - \
+            (web.y[c] + u * (web.y[d] - web.y[c]))
+        near = np.flatnonzero(np.hypot(xGap, yGap) < self.thickness)
+        return first[near], second[near], s[near], u[near], xGap[near], \
+            yGap[near]
+
+    def collide(self, web):
+        # Find every touching pair and stick or push it apart. Returns the
+        # new junctions when sticking.
+        first, second = self.pairs(web)
+        first, second, s, u, xGap, yGap = self.touching(web, first, second)
+        if len(first) == 0:
+            return []
+        if self.mode == WebContacts.STICK:
+            return self.stick(web, first, second, s, u, xGap, yGap)
+        web.wakeNodes(np.concatenate([web.springA[first],
+                                      web.springA[second]]))
+        self.repel(web, first, second, s, u, xGap, yGap)
+        return []
+
+    def stick(self, web, first, second, s, u, xGap, yGap):
+        # Join each crossing pair at a junction where they cross. A spring
+        # joins at most once per call, as it is split by doing so. Two ropes
+        # join at one node at most, or taut strands pulled together by a
+        # junction would keep crossing again beside it and tangle into ever
+        # more junctions. Springs shorter than two thicknesses are left
+        # alone too.
+        a, b = web.springA, web.springB
+        length = np.hypot(web.x[b[first]] - web.x[a[first]],
+                          web.y[b[first]] - web.y[a[first]])
+        otherLength = np.hypot(web.x[b[second]] - web.x[a[second]],
+                               web.y[b[second]] - web.y[a[second]])
+        keep = np.flatnonzero((np.hypot(xGap, yGap) < 1e-6) &
+                              (length >= 2 * self.thickness) &
+                              (otherLength >= 2 * self.thickness) &
+                              (web.springRope[first] >= 0) &
+                              (web.springRope[second] >= 0))
+        junctions = []
+        if len(keep) == 0:
+            return junctions
+        joined = self.joinedRopes(web)
+        used = set()
+        for p, q, sp, uq in zip(first[keep].tolist(), second[keep].tolist(),
+                                s[keep].tolist(), u[keep].tolist()):
+            ropes = (min(web.springRope[p], web.springRope[q]).item(),
+                     max(web.springRope[p], web.springRope[q]).item())
+            if p in used or q in used or ropes in joined:
+                continue
+            used.update((p, q))
+            joined.add(ropes)
+            ends = [a[p].item(), b[p].item(), a[q].item(), b[q].item()]
+            share = np.array([1 - sp, sp, 1 - uq, uq]) / 2
+            junction = web.newNode(
+                np.dot(share, web.x[ends]), np.dot(share, web.y[ends]), False,
+                web.springMaterial[p])
+            junction.xVel = np.dot(share, web.xVel[ends])
+            junction.yVel = np.dot(share, web.yVel[ends])
+            web.ropes[web.springRope[p]].spliceNode(junction, p)
+            web.ropes[web.springRope[q]].spliceNode(junction, q)
+            junctions.append(junction)
+        return junctions
+
+    def joinedRopes(self, web):
+        # Every pair of ropes sharing a node, as (lower, higher) rope ids,
+        # rebuilt lazily after the topology changes
+        if self.joinedVersion == web.topologyVersion:
+            return self.joined
+        indptr, neighbors, edgeSprings = web.adjacency()
+        ropes = web.springRope[edgeSprings]
+        node = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        # Only nodes where springs of more than one rope meet
+        mixed = np.unique(node[ropes != ropes[indptr[node]]])
+        joined = set()
+        for i in mixed.tolist():
+            around = sorted(set(ropes[indptr[i]:indptr[i + 1]].tolist()))
+            joined.update((r, o) for j, r in enumerate(around)
+                          for o in around[j + 1:])
+        self.joined, self.joinedVersion = joined, web.topologyVersion
+        return joined
+
+    def repel(self, web, first, second, s, u, xGap, yGap):
+        # Move the closest points of each pair apart to thickness, shared
+        # between the free ends of both springs, and take away the speed
+        # they close at along the gap
+        a, b = web.springA[first], web.springB[first]
+        c, d = web.springA[second], web.springB[second]
+        distance = np.hypot(xGap, yGap)
+        flat = distance < 1e-9
+        # Springs lying across each other part sideways to the first
+        xGap = np.where(flat, web.y[a] - web.y[b], xGap)
+        yGap = np.where(flat, web.x[b] - web.x[a], yGap)
+        length = np.hypot(xGap, yGap)
+        length[length == 0] = 1
+        xNormal, yNormal = xGap / length, yGap / length
+        ends = np.concatenate([a, b, c, d])
+        weight = (~web.fixed[ends]).astype(float) * \
+            np.concatenate([1 - s, s, -(1 - u), -u])
+        share = np.abs(weight).reshape(4, -1).sum(0)
+        push = (self.thickness - distance) / np.where(share > 0, share, 1)
+        push = np.tile(push, 4) * weight
+        # A node in several contacts moves by their average, as their sum
+        # overshoots in a tangle
+        n = web.numNodes
+        contacts = np.maximum(np.bincount(ends, weight != 0, n), 1)
+        web.x[:n] += np.bincount(ends, push * np.tile(xNormal, 4), n) / \
+            contacts
+        web.y[:n] += np.bincount(ends, push * np.tile(yNormal, 4), n) / \
+            contacts
+        # Closing speed of the two closest points along the gap
+        xVel, yVel = web.xVel[ends], web.yVel[ends]
+        along = np.concatenate([1 - s, s, 1 - u, u])
+        sign = np.repeat([1, -1], 2 * len(first))
+        closing = np.bincount(np.tile(np.arange(len(first)), 4),
+                              sign * along * (xVel * np.tile(xNormal, 4) +
+                                              yVel * np.tile(yNormal, 4)),
+                              len(first))
+        closing = np.minimum(closing, 0) / np.where(share > 0, share, 1)
+        change = np.tile(closing, 4) * weight
+        web.xVel[:n] -= np.bincount(ends, change * np.tile(xNormal, 4), n) / \
+            contacts
+        web.yVel[:n] -= np.bincount(ends, change * np.tile(yNormal, 4), n) / \
+            contacts
+
+
+def webField(name):
+    # Property reading and writing one slot of a Web array
+    def getter(self):
+        return getattr(self.web, name)[self.index].item()
+
+    def setter(self, value):
+        getattr(self.web, name)[self.index] = value
+        self.web.version += 1
+    return property(getter, setter)
 
 
 class Node(object):
+    # A view onto one web slot; the slots keep views to two references
+    __slots__ = ("web", "index")
 
-    def __init__(self, startX, startY):
-        self.x = startX
-        self.y = startY
-        self.mass = 100
-        self.xVel = 0
-        self.yVel = 0
-        self.xForce = 0
-        self.yForce = 0
+    def __init__(self, web, index):
+        self.web = web
+        self.index = index
+
+    x = webField("x")
+    y = webField("y")
+    xVel = webField("xVel")
+    yVel = webField("yVel")
+    xForce = webField("xForce")
+    yForce = webField("yForce")
+    mass = webField("mass")
 
     def __repr__(self):
         return "(%d, %d)" % (self.x, self.y)
 
+    def __eq__(self, other):
+        return (isinstance(other, Node) and self.web is other.web
+                and self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.web), self.index))
+
     def applyYForce(self, force):
-        self.yForce += force
+        self.web.yForce[self.index] += force
 
     def applyXForce(self, force):
-        self.xForce += force
+        self.web.xForce[self.index] += force
 
     def moveMass(self):
-        self.yVel += (self.yForce / self.mass) * 0.3
-        self.y += int(self.yVel * 0.3)
-        self.xVel += (self.xForce / self.mass) * 0.3
-        self.x += int(self.xVel * 0.3)
+        t = self.web.t
+        self.yVel += (self.yForce / self.mass) * t
+        self.y += int(self.yVel * t)
+        self.xVel += (self.xForce / self.mass) * t
+        self.x += int(self.xVel * t)
 
     def drawNode(self, gameDisplay):
-        pygame.draw.circle(gameDisplay, (0, 0, 0), [
-            self.x, self.y], 2)
+        pygame.draw.circle(gameDisplay, (0, 0, 0), [self.x, self.y], 2)
 
 
 class Spring(object):
+    __slots__ = ("web", "index")
+
+    def __init__(self, web, index):
+        self.web = web
+        self.index = index
+
+    @property
+    def length(self):
+        return self.web.springParameters([self.index])[0].item()
+
+    @property
+    def k(self):
+        return self.web.springParameters([self.index])[1].item()
+
+    @property
+    def friction(self):
+        return self.web.springParameters([self.index])[2].item()
 
-    def __init__(self, mass1, mass2):
-        self.m1 = mass1
-        self.m2 = mass2
-        self.length = 0.75
-        self.k = 500
-        self.friction = 50
+    @property
+    def m1(self):
+        return Node(self.web, self.web.springA[self.index].item())
+
+    @property
+    def m2(self):
+        return Node(self.web, self.web.springB[self.index].item())
 
     def __repr__(self):
         return "Spring(" + str(self.m1) + ", " + str(self.m2) + ")"
 
-    def drawSpring(self, gameDisplay, color=(0, 0, 0)):
-        pygame.draw.line(gameDisplay, color,
-                           (self.m1.x, self.m1.y), (self.m2.x, self.m2.y), 3)
-
     def solveSpring(self):
+        # Solve this spring alone; Web.step solves all of them in bulk.
+        # Reads the web arrays straight through rather than node views.
+        web, i = self.web, self.index
+        a, b = web.springA.item(i), web.springB.item(i)
+        material, span = web.springMaterial.item(i), web.span.item(i)
+        table = web.materialTable
+        length = table.item(material, Web.LENGTH) * span
+        k = table.item(material, Web.K) / span
+        friction = table.item(material, Web.FRICTION) / span
         forceY = 0
         forceX = 0
-        yLength = self.m2.y - self.m1.y
-        xLength = self.m2.x - self.m1.x
+        yLength = web.y.item(b) - web.y.item(a)
+        xLength = web.x.item(b) - web.x.item(a)
         vector = math.sqrt(yLength**2 + xLength**2)
         if abs(vector) > 0:
             # Set corrective Y spring forces
             forceY += -(yLength / abs(vector)) * \
-                (abs(vector) - self.length) * self.k
+                (abs(vector) - length) * k
             # Add in Y spring friction
-            forceY += (self.m1.yVel - self.m2.yVel) * self.friction
+            forceY += (web.yVel.item(a) - web.yVel.item(b)) * friction
             # Set corrective X spring forces
             forceX += -(xLength / abs(vector)) * \
-                (abs(vector) - self.length) * self.k
+                (abs(vector) - length) * k
             # Add in X spring friction
-            forceX += (self.m1.xVel - self.m2.xVel) * self.friction
-        self.m1.applyYForce(-forceY)
-        self.m2.applyYForce(forceY)
-        self.m1.applyXForce(-forceX)
-        self.m2.applyXForce(forceX)
+            forceX += (web.xVel.item(a) - web.xVel.item(b)) * friction
+        web.yForce[a] -= forceY
+        web.yForce[b] += forceY
+        web.xForce[a] -= forceX
+        web.xForce[b] += forceX
+
+    def drawSpring(self, gameDisplay, color=(255, 255, 255)):
+        m1, m2 = self.m1, self.m2
+        pygame.draw.line(gameDisplay, color, (m1.x, m1.y), (m2.x, m2.y), 3)
 
 
 class Rope(object):
 
-    def __init__(self, numNodes, x0, y0, x1, y1):
-        self.numNodes = numNodes
+    @staticmethod
+    def applyWind(force, ropeList):
+        # One bulk update per web rather than one per rope
+        webNodes = {}
+        for rope in ropeList:
+            rope.windForce = force
+            webNodes.setdefault(rope.web, []).append(rope.nodeIndices)
+        for web, nodes in webNodes.items():
+            web.setWind(np.concatenate(nodes), force)
+
+    def __init__(self, numNodes, x0, y0, x1, y1, web=None, material="SILK"):
+        Rope.weave(Web() if web is None else web, [x0], [y0], [x1], [y1],
+                   [numNodes], material, ropes=[self])
+
+    @staticmethod
+    def weave(web, x0, y0, x1, y1, numNodes, material="SILK", fixed0=True,
+              fixed1=True, ropes=None):
+        # Build strand i from (x0[i], y0[i]) to (x1[i], y1[i]) with
+        # numNodes[i] free nodes along it, for every i at once. The nodes
+        # and springs of all strands are added with a few array operations,
+        # so hundreds of strands take milliseconds. fixed0 and fixed1 say
+        # which ends are pinned. Returns the Ropes, which are made fresh
+        # unless given.
+        x0, y0, x1, y1 = [np.asarray(v, dtype=float) for v in (x0, y0, x1, y1)]
+        numNodes = np.asarray(numNodes, dtype=np.intp)
+        count = len(numNodes)
+        fixed0 = np.broadcast_to(fixed0, count)
+        fixed1 = np.broadcast_to(fixed1, count)
+        if ropes is None:
+            ropes = [Rope.__new__(Rope) for i in range(count)]
+        material = web.material(material)
         # Set the leftmost node as the startNode
-        if x1 < x0:
-            startX, startY = x1, y1
-            endX, endY = x0, y0
-        else:
-            startX, startY = x0, y0
-            endX, endY = x1, y1
-        self.startNode = Node(startX, startY)
-        self.endNode = Node(endX, endY)
-        # Create list of nodes
-        slopeY = int((endY - startY) / numNodes)
-        slopeX = int((endX - startX) / numNodes)
-        self.nodeList = []
-        for node in range(numNodes):
-            # Each node starts at a point on the straight line from (x0, y0)
-            self.nodeList.append(
-                Node(startX + slopeX * node, startY + slopeY * node))
-        # Connect all nodes with springs to create rope
-        # Attach the first node
-        self.springList = [Spring(self.startNode, self.nodeList[0])]
-        for spring in range(numNodes - 1):
-            self.springList.append(
-                Spring(self.nodeList[spring], self.nodeList[spring + 1]))
-        # Attach the last node
-        self.springList.append(
-            Spring(self.nodeList[len(self.nodeList) - 1], self.endNode))
-        # Set slope
-        if slopeX == 0:
-            self.slope = None
-            self.intercept = None
-        else:
-            self.slope = slopeY / slopeX
-            self.intercept = startY - 1 * self.slope * startX
+        swap = x1 < x0
+        startX, endX = np.where(swap, x1, x0), np.where(swap, x0, x1)
+        startY, endY = np.where(swap, y1, y0), np.where(swap, y0, y1)
+        startFixed = np.where(swap, fixed1, fixed0)
+        endFixed = np.where(swap, fixed0, fixed1)
+        starts = web.newNodes(startX, startY, startFixed, material)
+        ends = web.newNodes(endX, endY, endFixed, material)
+        # Each node starts at a point on the straight line from the start
+        slopeX = np.trunc((endX - startX) / np.maximum(numNodes, 1))
+        slopeY = np.trunc((endY - startY) / np.maximum(numNodes, 1))
+        owner = np.repeat(np.arange(count), numNodes)
+        first = np.cumsum(numNodes) - numNodes
+        along = np.arange(len(owner)) - first[owner]
+        nodes = web.newNodes(startX[owner] + slopeX[owner] * along,
+                             startY[owner] + slopeY[owner] * along, False,
+                             material)
+        # Connect all nodes with springs: start, nodes, end per strand
+        length = numNodes + 2
+        chainFirst = np.cumsum(length) - length
+        chain = np.empty(length.sum(), dtype=np.intp)
+        chain[chainFirst] = starts
+        chain[chainFirst + length - 1] = ends
+        chain[chainFirst[owner] + 1 + along] = nodes
+        a = np.delete(np.arange(len(chain) - 1),
+                      (chainFirst + length)[:-1] - 1)
+        ropeIds = np.arange(len(web.ropes), len(web.ropes) + count)
+        web.ropes.extend(ropes)
+        springs = web.newSprings(chain[a], chain[a + 1],
+                                 np.repeat(ropeIds, numNodes + 1), 1, material)
+        springFirst = np.cumsum(numNodes + 1) - numNodes - 1
+        nodeList, springList = nodes.tolist(), springs.tolist()
+        for rope, n, ropeId, x, y, sx, sy, s, e, f, g in zip(
+                ropes, numNodes.tolist(), ropeIds.tolist(), startX.tolist(),
+                startY.tolist(), slopeX.tolist(), slopeY.tolist(),
+                starts.tolist(), ends.tolist(), first.tolist(),
+                springFirst.tolist()):
+            rope.numNodes = n
+            # Ropes sharing a web are all solved together by Web.step
+            rope.web = web
+            rope.ropeId = ropeId
+            rope.material = material
+            rope.startNode = Node(web, s)
+            rope.endNode = Node(web, e)
+            # Membership only ever grows by appending; chain order is
+            # rebuilt from the web's adjacency when it is next asked for
+            rope.nodeIds = nodeList[f:f + n]
+            rope.springIds = springList[g:g + n + 1]
+            rope.nodeIdArray = nodes[f:f + n]
+            rope.springIdArray = springs[g:g + n + 1]
+            rope.chainDirty = True
+            rope.remeshParity = 0
+            # Set slope
+            if sx == 0:
+                rope.slope = None
+                rope.intercept = None
+            else:
+                rope.slope = sy / sx
+                rope.intercept = y - 1 * rope.slope * x
+            # New nodes start without wind, so there is nothing to set
+            rope.windForce = 0
+        return ropes
+
+    @property
+    def nodeIndices(self):
+        if len(self.nodeIdArray) != len(self.nodeIds):
+            self.nodeIdArray = np.array(self.nodeIds, dtype=np.intp)
+        return self.nodeIdArray
+
+    @property
+    def springIndices(self):
+        if len(self.springIdArray) != len(self.springIds):
+            self.springIdArray = np.array(self.springIds, dtype=np.intp)
+        return self.springIdArray
+
+    def chain(self):
+        # Node and spring indices in order from startNode to endNode
+        if self.chainDirty:
+            indptr, neighbors, edgeSprings = self.web.adjacency()
+            springRope = self.web.springRope
+            node = self.startNode.index
+            chainNodes, chainSprings = [node], []
+            spring = -1
+            while node != self.endNode.index:
+                for edge in range(indptr[node], indptr[node + 1]):
+                    if (springRope[edgeSprings[edge]] == self.ropeId
+                            and edgeSprings[edge] != spring):
+                        break
+                else:
+                    break  # Dangling strand, stop walking
+                spring = edgeSprings[edge].item()
+                node = neighbors[edge].item()
+                chainSprings.append(spring)
+                chainNodes.append(node)
+            self.chainNodes, self.chainSprings = chainNodes, chainSprings
+            self.chainDirty = False
+        return self.chainNodes, self.chainSprings
+
+    @property
+    def nodeList(self):
+        return [Node(self.web, i) for i in self.chain()[0][1:-1]]
+
+    @property
+    def springList(self):
+        return [Spring(self.web, i) for i in self.chain()[1]]
+
+    @property
+    def wind(self):
+        return self.windForce
+
+    @wind.setter
+    def wind(self, force):
+        self.windForce = force
+        self.web.setWind(self.nodeIndices, force)
+
+    @property
+    def asleep(self):
+        return bool(self.web.asleep[self.nodeIndices].all())
 
     def updateRope(self):
-        for node in self.nodeList:
-            node.xForce = 0
-            node.yForce = 0
-            node.applyYForce(2 * node.mass)
-            node.applyXForce(self.wind)
-        for spring in self.springList:
-            spring.solveSpring()
-        for node in self.nodeList:
-            node.moveMass()
+        # Steps every rope in this rope's web
+        self.web.step()
 
     def applyXForce(self, force):
         # Apply a force to every node in the rope
-        for node in self.nodeList:
-            node.applyXForce(force)
+        self.web.xForce[self.nodeIndices] += force
 
-    def drawRope(self, gameDisplay):
-        for spring in self.springList:
-            spring.drawSpring(gameDisplay)
+    def drawRope(self, gameDisplay, color=(255, 255, 255), alpha=1.0,
+                 width=3):
+        x, y = self.web.positions(self.chain()[0], alpha)
+        points = np.column_stack((x, y)).tolist()
+        pygame.draw.lines(gameDisplay, color, False, points, width)
+
+    def inView(self, view):
+        # Whether the rope's bounding box overlaps view, (x, y, w, h)
+        nodes = self.chain()[0]
+        x, y = self.web.x[nodes], self.web.y[nodes]
+        return (x.max() >= view[0] and x.min() <= view[0] + view[2] and
+                y.max() >= view[1] and y.min() <= view[1] + view[3])
 
     def ropeLength(self):
-        return getLineLength(self.startNode.x, self.startNode.y, self.endNode.x, self.endNode.y)
+        return getLineLength(self.startNode.x, self.startNode.y,
+                             self.endNode.x, self.endNode.y)
 
-    def pointOnRope(self, x, y):
+    def pointOnRope(self, x, y):  # Verify that a point is on the rope
         return (x >= min(self.startNode.x, self.endNode.x)
-            and x <= max(self.startNode.x, self.endNode.x)
-            and y >= min(self.startNode.y, self.endNode.y)
-            and y <= max(self.startNode.y, self.endNode.y))
+                and x <= max(self.startNode.x, self.endNode.x)
+                and y >= min(self.startNode.y, self.endNode.y)
+                and y <= max(self.startNode.y, self.endNode.y))
 
     def getIntersection(self, other):
         if self.slope == other.slope:
             return None
-        elif self.slope == None:
+        elif self.slope is None:
             x = self.startNode.x
-            y = int(other.slope * x  + other.intercept)
-        elif other.slope == None:
+            y = int(other.slope * x + other.intercept)
+        elif other.slope is None:
             x = other.startNode.x
             y = int(self.slope * x + self.intercept)
         else:
@@ -159,27 +1976,185 @@ class Rope(object):
 
     def solveIntersection(self, other):
         points = self.getIntersection(other)
-        if points == None: return None # Stop if there is no intersection
-        temp = Node(points[0], points[1])
-        # Calculate the location to insert new node on self rope
-        selfDiff = self.ropeLength()
-        selfRatio = getLineLength(self.startNode.x, self.startNode.y, points[0], points[1])
-        selfInsert = int((selfRatio * len(self.nodeList))/selfDiff)
-        print(selfInsert)
-        prevNode = selfInsert - 1
-        nextNode = selfInsert + 1
-        self.nodeList.insert(selfInsert, temp)
-        self.springList.append(Spring(self.nodeList[prevNode], temp))
-        print(self.springList)
-        print(self.nodeList[prevNode], temp, self.nodeList[nextNode])
-        # Calculate the location to insert new node on other rope
-        otherDiff = other.ropeLength()
-        otherRatio = getLineLength(other.startNode.x, other.startNode.y, points[0], points[1])
-        otherInsert = int((otherRatio * len(other.nodeList))/otherDiff)
-        print(otherInsert)
-        other.nodeList.insert(otherInsert, temp)
-        other.springList.append(Spring(other.nodeList[otherInsert - 1], temp))
+        if points is None:
+            return None  # Stop if there is no intersection
+        junction = self.web.newNode(points[0], points[1], False,
+                                    self.material)
+        self.spliceNode(junction)
+        other.spliceNode(junction)
+        return junction
+
+    def solveIntersections(self, webGrid):
+        # Join this rope to every strand it crosses, found through webGrid
+        # rather than by trying every other rope. Returns the junctions.
+        web = self.web
+        start, end = self.startNode, self.endNode
+        junctions = []
+        newSprings = list(self.springIds)
+        for spring, x, y in webGrid.crossings(web, start.x, start.y,
+                                              end.x, end.y):
+            if web.springRope[spring] < 0:
+                continue
+            rope = web.ropes[web.springRope[spring]]
+            if rope is self:
+                continue
+            junction = web.newNode(int(x), int(y), False, self.material)
+            newSprings.append(rope.spliceNode(junction, spring).index)
+            newSprings.append(self.spliceNode(junction).index)
+            junctions.append(junction)
+        webGrid.add(web, newSprings)
+        return junctions
+
+    def weld(self, webGrid, tolerance=3):
+        # Merge every node of this rope lying within tolerance of another
+        # node into it, found through webGrid. Nodes only merge with nodes
+        # that are fixed alike, unless they are neighbours along this rope,
+        # where the spring between them just goes. Returns how many nodes
+        # went.
+        web = self.web
+        nodes = np.array(self.chain()[0], dtype=np.intp)
+        x, y = web.x[nodes], web.y[nodes]
+        keys, owner = webGrid.boxCells(x, y, x, y, tolerance)
+        springs, counts = webGrid.filed(keys)
+        springs = webGrid.springs[springs]
+        owner = np.tile(np.repeat(owner, counts), 2)
+        other = np.concatenate([web.springA[springs], web.springB[springs]])
+        springs = np.tile(springs, 2)
+        position = np.full(web.numNodes, -1, dtype=np.intp)
+        position[nodes] = np.arange(len(nodes))
+        mine = position[other] >= 0
+        near = web.springAlive[springs] & web.alive[other] & \
+            (other != nodes[owner]) & \
+            (np.hypot(web.x[other] - x[owner],
+                      web.y[other] - y[owner]) <= tolerance) & \
+            np.where(mine, np.abs(position[other] - owner) == 1,
+                     web.fixed[other] == web.fixed[nodes[owner]])
+        owner, other, mine = owner[near], other[near], mine[near]
+        # Along this rope the fixed end stays, elsewhere the old node does
+        keepOther = ~mine | web.fixed[other] | \
+            (~web.fixed[nodes[owner]] & (position[other] < owner))
+        drop = np.where(keepOther, nodes[owner], other).tolist()
+        keep = np.where(keepOther, other, nodes[owner]).tolist()
+        target = {}
+        for d, k in zip(drop, keep):
+            while k in target:
+                k = target[k]
+            if d not in target and d != k:
+                target[d] = k
+        if len(target) == 0:
+            return 0
+        # Nodes merged into a node that merged on in turn follow it
+        drop = list(target)
+        keep = []
+        for k in target.values():
+            while k in target:
+                k = target[k]
+            keep.append(k)
+        web.weld(drop, keep)
+        return len(drop)
+
+    def spliceNode(self, node, spring=None):
+        # Split spring, or the spring of this rope closest to node, so that
+        # node joins the chain between its two ends. Returns the new spring.
+        web = self.web
+        if spring is not None:
+            newSpring = web.splitSpring(Spring(web, spring), node)
+            self.nodeIds.append(node.index)
+            self.springIds.append(newSpring.index)
+            self.chainDirty = True
+            return newSpring
+        springs = self.springIndices
+        a, b = web.springA[springs], web.springB[springs]
+        xLength = web.x[b] - web.x[a]
+        yLength = web.y[b] - web.y[a]
+        xOffset = node.x - web.x[a]
+        yOffset = node.y - web.y[a]
+        squared = xLength**2 + yLength**2
+        along = np.clip((xOffset * xLength + yOffset * yLength) /
+                        np.where(squared > 0, squared, 1), 0, 1)
+        distance = np.hypot(xOffset - along * xLength,
+                            yOffset - along * yLength)
+        closest = Spring(web, springs[np.argmin(distance)].item())
+        return self.spliceNode(node, closest.index)
+
+    def remesh(self, view=None, impacts=()):
+        # Merge nodes where the rope runs straight or out of view, and split
+        # springs again where it bends or a bug just hit it, so node count
+        # follows what can be seen moving. view is (x, y, width, height) in
+        # web coordinates. Fixed and junction nodes always stay.
+        web = self.web
+        nodes, springs = self.chain()
+        nodes, springs = np.array(nodes), np.array(springs)
+        if len(springs) < 2:
+            return
+        x, y = web.x[nodes], web.y[nodes]
+        xLength, yLength = np.diff(x), np.diff(y)
+        turn = np.abs(np.arctan2(xLength[:-1] * yLength[1:] -
+                                 yLength[:-1] * xLength[1:],
+                                 xLength[:-1] * xLength[1:] +
+                                 yLength[:-1] * yLength[1:]))
+        turn = np.concatenate(([0], turn, [0]))
+        if view is None:
+            hidden = np.zeros(len(nodes), dtype=bool)
+        else:
+            hidden = ((x < view[0]) | (x > view[0] + view[2]) |
+                      (y < view[1]) | (y > view[1] + view[3]))
+        span = web.span[springs]
+        # Merge every other candidate so that neighbours never both go
+        self.remeshParity = 1 - self.remeshParity
+        inner = np.arange(1, len(nodes) - 1)
+        merge = inner[(web.degree()[nodes[inner]] == 2) &
+                      ~web.fixed[nodes[inner]] &
+                      (span[inner - 1] + span[inner] <= web.maxSpan) &
+                      ((turn[inner] < web.mergeTurn) |
+                       (hidden[inner - 1] & hidden[inner] &
+                        hidden[inner + 1])) &
+                      (inner % 2 == self.remeshParity)]
+        bent = (np.maximum(turn[:-1], turn[1:]) > web.splitTurn) & \
+            ~(hidden[:-1] & hidden[1:])
+        for point in impacts:
+            bent |= np.hypot((x[:-1] + x[1:]) / 2 - point[0],
+                             (y[:-1] + y[1:]) / 2 - point[1]) < 30
+        split = np.flatnonzero(bent & (span >= 2))
+        # Springs next to a merged node are about to change
+        split = split[~np.isin(split, merge) & ~np.isin(split + 1, merge)]
+        if len(merge) == 0 and len(split) == 0:
+            return
+        for i in merge:
+            node, left, right = nodes[i], springs[i - 1], springs[i]
+            if web.springA[left] == node:
+                web.springA[left] = nodes[i + 1]
+            else:
+                web.springB[left] = nodes[i + 1]
+            web.setSpan(left, span[i - 1] + span[i])
+            web.removeSpring(right)
+            web.removeNode(node)
+        for i in split:
+            a, b = nodes[i], nodes[i + 1]
+            middle = web.newNode((x[i] + x[i + 1]) / 2,
+                                 (y[i] + y[i + 1]) / 2, False, self.material)
+            web.xVel[middle.index] = (web.xVel[a] + web.xVel[b]) / 2
+            web.yVel[middle.index] = (web.yVel[a] + web.yVel[b]) / 2
+            web.wind[middle.index] = (web.wind[a] + web.wind[b]) / 2
+            newSpring = web.splitSpring(Spring(web, springs[i]), middle)
+            web.setSpan([springs[i], newSpring.index], span[i] / 2)
+        self.chainDirty = True
+        self.reindex()
+        # Each plain node carries the mass of half of each of its springs
+        nodes, springs = self.chain()
+        nodes = np.array(nodes[1:-1], dtype=np.intp)
+        span = web.span[springs]
+        plain = web.degree()[nodes] == 2
+        mass = web.materialTable[self.material, Web.MASS]
+        web.mass[nodes[plain]] = mass * (span[:-1] + span[1:])[plain] / 2
 
+    def reindex(self):
+        # Rebuild membership from the chain after nodes were removed
+        nodes, springs = self.chain()
+        self.nodeIds = nodes[1:-1]
+        self.springIds = list(springs)
+        self.nodeIdArray = np.array(self.nodeIds, dtype=np.intp)
+        self.springIdArray = np.array(self.springIds, dtype=np.intp)
 
 
 def getLineLength(x0, y0, x1, y1):
@@ -0,0 +1,227 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import sys
+import time
+import json
+import argparse
+import numpy as np
+from Rope_Class import *
+##########################################################################
+# Integrator benchmark
+"""
+Runs canonical webs headless under every solver configuration and prints
+one JSON object per scenario and configuration: how fast it steps, and how
+far its energy and node positions end up from a high resolution reference
+of the same spring model. For example
+
+    python rope-benchmark.py --time 30 --integrators EULER IMPLICIT
+"""
+##########################################################################
+# Scenarios
+##########################################################################
+
+
+def sagScenario(web):
+    # One strand hanging between two pins
+    return [Rope(20, 100, 100, 400, 100, web)]
+
+
+def crossingScenario(web):
+    # Two strands joined where they cross
+    first = Rope(20, 100, 100, 400, 180, web)
+    second = Rope(20, 120, 220, 380, 60, web)
+    first.solveIntersection(second)
+    return [first, second]
+
+
+def fanScenario(web, spokes=48):
+    # Strands fanning out from one point, tied together by a strand across
+    # all of them
+    angle = np.linspace(np.pi * 0.15, np.pi * 0.85, spokes)
+    ropes = Rope.weave(web, np.full(spokes, 300), np.full(spokes, 60),
+                       300 + 260 * np.cos(angle), 60 + 260 * np.sin(angle),
+                       np.full(spokes, 18))
+    grid = WebGrid()
+    grid.update(web)
+    cross = Rope(40, 60, 200, 540, 200, web)
+    cross.solveIntersections(grid)
+    return ropes + [cross]
+
+
+scenarios = {
+    "sag": sagScenario,
+    "crossing": crossingScenario,
+    "fan": fanScenario
+}
+
+##########################################################################
+# Measures
+##########################################################################
+
+
+def buildWeb(scenario, wind):
+    # A fresh web of scenario that never sleeps, so every configuration
+    # steps every node for the whole run
+    web = Web()
+    ropes = scenarios[scenario](web)
+    web.sleepEnergy = -1
+    Rope.applyWind(wind, ropes)
+    return web
+
+
+def freeNodes(web):
+    n = web.numNodes
+    return np.flatnonzero(web.alive[:n] & ~web.fixed[:n])
+
+
+def acceleration(web, x, y, xVel, yVel, free):
+    # Acceleration of every node under gravity, wind and the force based
+    # springs that Web.stepEuler integrates
+    springs = web.liveSprings()
+    a, b = web.springA[springs], web.springB[springs]
+    length, k, friction = web.springParameters(springs)
+    forceX, forceY = springForces(x, y, xVel, yVel, a, b, length, k,
+                                  friction)
+    n = len(x)
+    mass = np.where(web.mass[:n] > 0, web.mass[:n], 1)
+    xForce = web.wind[:n] * mass / Web.windMass + \
+        np.bincount(b, forceX, n) - np.bincount(a, forceX, n)
+    yForce = web.gravity * mass + \
+        np.bincount(b, forceY, n) - np.bincount(a, forceY, n)
+    return np.where(free, xForce / mass, 0), np.where(free, yForce / mass, 0)
+
+
+def reference(web, duration, substep):
+    # Classic Runge-Kutta on the continuous spring model, substep at a
+    # time. Returns node positions after duration.
+    n = web.numNodes
+    free = np.zeros(n, dtype=bool)
+    free[freeNodes(web)] = True
+    state = [web.x[:n].copy(), web.y[:n].copy(), web.xVel[:n].copy(),
+             web.yVel[:n].copy()]
+
+    def derivative(x, y, xVel, yVel):
+        xAcc, yAcc = acceleration(web, x, y, xVel, yVel, free)
+        return [np.where(free, xVel, 0), np.where(free, yVel, 0), xAcc, yAcc]
+    for i in range(int(round(duration / substep))):
+        k1 = derivative(*state)
+        k2 = derivative(*[s + d * substep / 2 for s, d in zip(state, k1)])
+        k3 = derivative(*[s + d * substep / 2 for s, d in zip(state, k2)])
+        k4 = derivative(*[s + d * substep for s, d in zip(state, k3)])
+        state = [s + (d1 + 2 * d2 + 2 * d3 + d4) * substep / 6
+                 for s, d1, d2, d3, d4 in zip(state, k1, k2, k3, k4)]
+    return state
+
+
+def energy(web, x, y, xVel, yVel):
+    # Kinetic energy, plus the potential of gravity and wind on the free
+    # nodes and the energy stored in every spring
+    nodes = freeNodes(web)
+    mass = web.mass[nodes]
+    kinetic = 0.5 * mass * (xVel[nodes]**2 + yVel[nodes]**2)
+    potential = -web.gravity * mass * y[nodes] - \
+        web.wind[nodes] * mass / Web.windMass * x[nodes]
+    springs = web.liveSprings()
+    a, b = web.springA[springs], web.springB[springs]
+    length, k, friction = web.springParameters(springs)
+    stretch = np.hypot(x[b] - x[a], y[b] - y[a]) - length
+    return kinetic.sum() + potential.sum() + (0.5 * k * stretch**2).sum()
+
+
+def benchmark(scenario, integrator, t, adaptive, duration, wind, repeat,
+              target):
+    # Step a fresh web of scenario for duration under one configuration,
+    # best wall time of repeat runs, and compare it with target, the
+    # reference positions, velocities and energy at the same time
+    steps = int(round(duration / t))
+    best = None
+    for i in range(repeat):
+        web = buildWeb(scenario, wind)
+        web.integrator = getattr(Web, integrator)
+        web.t = t
+        web.adaptive = adaptive
+        start = time.perf_counter()
+        for step in range(steps):
+            web.step()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    nodes = freeNodes(web)
+    x, y, xVel, yVel, startEnergy, endEnergy = target
+    error = np.hypot(web.x[nodes] - x[nodes], web.y[nodes] - y[nodes])
+    finalEnergy = energy(web, web.x, web.y, web.xVel, web.yVel)
+    return {
+        "scenario": scenario,
+        "integrator": integrator,
+        "t": t,
+        "adaptive": adaptive,
+        "nodes": len(nodes),
+        "springs": len(web.liveSprings()),
+        "steps": steps,
+        "seconds": best,
+        "stepsPerSecond": steps / best,
+        "nodeStepsPerSecond": steps * len(nodes) / best,
+        # Energy gained or lost against the reference, as a share of the
+        # energy the web started with
+        "energyDrift": (finalEnergy - endEnergy) / abs(startEnergy),
+        "positionError": float(np.sqrt(np.mean(error**2))),
+        "maxPositionError": float(error.max()),
+        "finite": bool(np.isfinite(web.x[nodes]).all() and
+                       np.isfinite(web.y[nodes]).all())
+    }
+
+##########################################################################
+# Main
+##########################################################################
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(
+        description="Accuracy against cost of every rope integrator")
+    parser.add_argument("--scenarios", nargs="+", default=list(scenarios),
+                        choices=list(scenarios))
+    parser.add_argument("--integrators", nargs="+",
+                        default=["EULER", "VERLET", "IMPLICIT", "FIXED"],
+                        choices=["EULER", "VERLET", "IMPLICIT", "FIXED"])
+    parser.add_argument("--steps", nargs="+", type=float,
+                        default=[0.15, Web.t, 0.6],
+                        help="timesteps to try every integrator at")
+    parser.add_argument("--time", type=float, default=36,
+                        help="simulated time every run covers")
+    parser.add_argument("--wind", type=float, default=60)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per configuration, the fastest counts")
+    parser.add_argument("--refine", type=int, default=64,
+                        help="reference substeps per default timestep")
+    parser.add_argument("--csv", action="store_true",
+                        help="comma separated rows instead of JSON lines")
+    options = parser.parse_args(arguments)
+    rows = []
+    for scenario in options.scenarios:
+        web = buildWeb(scenario, options.wind)
+        n = web.numNodes
+        startEnergy = energy(web, web.x[:n], web.y[:n], web.xVel[:n],
+                             web.yVel[:n])
+        x, y, xVel, yVel = reference(web, options.time,
+                                     Web.t / options.refine)
+        target = (x, y, xVel, yVel, startEnergy,
+                  energy(web, x, y, xVel, yVel))
+        for integrator in options.integrators:
+            for t in options.steps:
+                # Only Euler has substeps to turn off
+                for adaptive in ([True, False] if integrator == "EULER"
+                                 else [True]):
+                    row = benchmark(scenario, integrator, t, adaptive,
+                                    options.time, options.wind,
+                                    options.repeat, target)
+                    rows.append(row)
+                    if not options.csv:
+                        print(json.dumps(row))
+                        sys.stdout.flush()
+    if options.csv:
+        print(",".join(rows[0]))
+        for row in rows:
+            print(",".join(str(value) for value in row.values()))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
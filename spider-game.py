@@ -1,8 +1,10 @@
 import pygame
+import numpy as np
 import math
 import random
 import copy
 import os
+from Rope_Class import *
 ##########################################################################
 # Tutorial
 """
@@ -45,193 +47,6 @@ def getCenter(width, surface):
 # Classes
 ##########################################################################
 
-# Rope Classes
-
-
-class Node(object):
-
-    def __init__(self, startX, startY):
-        self.x = startX
-        self.y = startY
-        self.mass = 100
-        self.xVel = 0
-        self.yVel = 0
-        self.xForce = 0
-        self.yForce = 0
-        self.t = 0.3
-
-    def __repr__(self):
-        return "(%d, %d)" % (self.x, self.y)
-
-    def applyYForce(self, force):
-        self.yForce += force
-
-    def applyXForce(self, force):
-        self.xForce += force
-
-    def moveMass(self):
-        self.yVel += (self.yForce / self.mass) * self.t
-        self.y += int(self.yVel * self.t)
-        self.xVel += (self.xForce / self.mass) * self.t
-        self.x += int(self.xVel * self.t)
-
-    def drawNode(self, gameDisplay):
-        pygame.draw.circle(gameDisplay, (0, 0, 0), [self.x, self.y], 2)
-
-
-class Spring(object):
-
-    def __init__(self, mass1, mass2):
-        self.m1 = mass1
-        self.m2 = mass2
-        self.length = 0.75
-        self.k = 300
-        self.friction = 50
-
-    def __repr__(self):
-        return "Spring(" + str(self.m1) + ", " + str(self.m2) + ")"
-
-    def solveSpring(self):
-        forceY = 0
-        forceX = 0
-        yLength = self.m2.y - self.m1.y
-        xLength = self.m2.x - self.m1.x
-        vector = math.sqrt(yLength**2 + xLength**2)
-        if abs(vector) > 0:
-            # Set corrective Y spring forces
-            forceY += -(yLength / abs(vector)) * \
-                (abs(vector) - self.length) * self.k
-            # Add in Y spring friction
-            forceY += (self.m1.yVel - self.m2.yVel) * self.friction
-            # Set corrective X spring forces
-            forceX += -(xLength / abs(vector)) * \
-                (abs(vector) - self.length) * self.k
-            # Add in X spring friction
-            forceX += (self.m1.xVel - self.m2.xVel) * self.friction
-        self.m1.applyYForce(-forceY)
-        self.m2.applyYForce(forceY)
-        self.m1.applyXForce(-forceX)
-        self.m2.applyXForce(forceX)
-
-    def drawSpring(self, gameDisplay, color=(255, 255, 255)):
-        pygame.draw.line(gameDisplay, color,
-                         (self.m1.x, self.m1.y), (self.m2.x, self.m2.y), 3)
-
-
-class Rope(object):
-
-    @staticmethod
-    def applyWind(force, ropeList):
-        for rope in ropeList:
-            rope.wind = force
-
-    def __init__(self, numNodes, x0, y0, x1, y1):
-        self.numNodes = numNodes
-        # Set the leftmost node as the startNode
-        if x1 < x0:
-            startX, startY = x1, y1
-            endX, endY = x0, y0
-        else:
-            startX, startY = x0, y0
-            endX, endY = x1, y1
-        self.startNode = Node(startX, startY)
-        self.endNode = Node(endX, endY)
-        # Create list of nodes
-        slopeY = int((endY - startY) / numNodes)
-        slopeX = int((endX - startX) / numNodes)
-        self.nodeList = []
-        for node in range(numNodes):
-            # Each node starts at a point on the straight line from (x0, y0)
-            self.nodeList.append(
-                Node(startX + slopeX * node, startY + slopeY * node))
-        # Connect all nodes with springs to create rope
-        # Attach the first node
-        self.springList = [Spring(self.startNode, self.nodeList[0])]
-        for spring in range(numNodes - 1):
-            self.springList.append(
-                Spring(self.nodeList[spring], self.nodeList[spring + 1]))
-        # Attach the last node
-        self.springList.append(
-            Spring(self.nodeList[len(self.nodeList) - 1], self.endNode))
-        # Set slope
-        if slopeX == 0:
-            self.slope = None
-            self.intercept = None
-        else:
-            self.slope = slopeY / slopeX
-            self.intercept = startY - 1 * self.slope * startX
-        self.wind = 0
-
-    def updateRope(self):
-        for node in self.nodeList:
-            # Reset the forces
-            node.xForce = 0
-            node.yForce = 0
-            node.applyYForce(2 * node.mass)
-            node.applyXForce(self.wind)
-        for spring in self.springList:
-            spring.solveSpring()
-        for node in self.nodeList:
-            node.moveMass()
-
-    def applyXForce(self, force):
-        # Apply a force to every node in the rope
-        for node in self.nodeList:
-            node.applyXForce(force)
-
-    def drawRope(self, gameDisplay):
-        for spring in self.springList:
-            spring.drawSpring(gameDisplay)
-
-    def ropeLength(self):
-        return getLineLength(self.startNode.x, self.startNode.y,
-                             self.endNode.x, self.endNode.y)
-
-    def pointOnRope(self, x, y):  # Verify that a point is on the rope
-        return (x >= min(self.startNode.x, self.endNode.x)
-                and x <= max(self.startNode.x, self.endNode.x)
-                and y >= min(self.startNode.y, self.endNode.y)
-                and y <= max(self.startNode.y, self.endNode.y))
-
-    def getIntersection(self, other):
-        if self.slope == other.slope:
-            return None
-        elif self.slope is None:
-            x = self.startNode.x
-            y = int(other.slope * x + other.intercept)
-        elif other.slope is None:
-            x = other.startNode.x
-            y = int(self.slope * x + self.intercept)
-        else:
-            b = other.intercept - self.intercept
-            m = self.slope - other.slope
-            x = int(b / m)
-            y = int(self.slope * x + self.intercept)
-        if self.pointOnRope(x, y) and other.pointOnRope(x, y):
-            return (x, y)
-        return None
-
-    def solveIntersection(self, other):
-        points = self.getIntersection(other)
-        if points is None:
-            return None  # Stop if there is no intersection
-        temp = Node(points[0], points[1])
-        # Calculate the location to insert new node on self rope
-        selfDiff = self.ropeLength()
-        selfRatio = getLineLength(
-            self.startNode.x, self.startNode.y, points[0], points[1])
-        selfInsert = int((selfRatio * len(self.nodeList)) / selfDiff)
-        prevNode = selfInsert - 1
-        self.nodeList.insert(selfInsert, temp)
-        self.springList.append(Spring(self.nodeList[prevNode], temp))
-        # Calculate the location to insert new node on other rope
-        otherDiff = other.ropeLength()
-        otherRatio = getLineLength(
-            other.startNode.x, other.startNode.y, points[0], points[1])
-        otherInsert = int((otherRatio * len(other.nodeList)) / otherDiff)
-        other.nodeList.insert(otherInsert, temp)
-        other.springList.append(Spring(other.nodeList[otherInsert - 1], temp))
-
 # Tree Classes
 
 
@@ -297,6 +112,9 @@ class Branch(object):
         self.angle = angle
         self.depth = depth
         self.polygon = BranchPolygon(self)
+        # The treeDrawing holding the branch and where in its branches
+        self.tree = None
+        self.index = -1
 
     def __repr__(self):
         return "(" + str(self.start) + "," + str(self.end) + "," \
@@ -308,10 +126,14 @@ class Branch(object):
         pygame.draw.polygon(gameDisplay, color, self.polygon.pointList)
 
     def inBranch(self, point):
-        return self.polygon.pointInPolygon(point)
+        if self.tree is None:
+            return self.polygon.pointInPolygon(point)
+        return self.tree.branchIndexAt(point) == self.index
 
 
 class treeDrawing(object):
+    # Color left clear on the drawing of the tree
+    renderKey = (255, 0, 255)
 
     @staticmethod
     def makeRecursiveTree(startPoint, numBranches):
@@ -349,10 +171,168 @@ class treeDrawing(object):
         return branchList
 
     def pointOnBranch(self, point):
-        for branch in self.branches:
-            if branch.inBranch(point):
-                return branch
-        return None
+        index = self.branchIndexAt(point)
+        return None if index < 0 else self.branches[index]
+
+    def availableAt(self, point):
+        # Whether the branch drawn at point is one of availableBranches
+        index = self.branchIndexAt(point)
+        return index >= 0 and self.pickAvailable[index]
+
+    def branchIndexAt(self, point):
+        # Index of the branch drawn at point, or -1, from the picking
+        # raster
+        self.pickRaster()
+        x = math.floor(point[0] - self.rect[0][0]) - self.pickCorner[0]
+        y = math.floor(point[1] - self.rect[0][1]) - self.pickCorner[1]
+        if x < 0 or y < 0 or x >= self.picking.shape[0] or \
+                y >= self.picking.shape[1]:
+            return -1
+        return int(self.picking[x, y]) - 1
+
+    def pickRaster(self):
+        # One past the index of the branch drawn at every pixel around the
+        # tree, drawn in the order drawTree draws so the branch on top
+        # wins. Kept relative to the rect, so moving the tree leaves it
+        # good. It's drawn again when the tree is scaled or gains an
+        # available branch, or when a sway has moved the branches more
+        # than pickTolerance pixels since it was drawn.
+        if self.picking is not None and \
+                self.pickCount == len(self.availableBranches):
+            if self.sway is None or self.pickPose == self.sway.poses:
+                return
+            self.pickPose = self.sway.poses
+            if np.abs(self.sway.points - self.rect[0] -
+                      self.pickPoints).max() <= self.pickTolerance:
+                return
+        points = self.branchPoints()
+        if self.sway is not None:
+            self.pickPose = self.sway.poses
+        if self.picking is None or \
+                not self.fits(points, self.pickCorner, self.picking.shape):
+            self.picking = None
+            self.pickCorner, size = self.surfaceBox(points)
+            self.pickSurface = pygame.Surface(
+                size, depth=8 if len(self.branches) < 255 else 16)
+            self.picking = pygame.surfarray.pixels2d(self.pickSurface)
+        self.picking[:] = 0
+        available = self.availableMask()
+        for i in self.drawOrder(available).tolist():
+            corners = (points[i] - self.pickCorner).tolist()
+            pygame.draw.lines(self.pickSurface, i + 1, True, corners, 2)
+            pygame.draw.polygon(self.pickSurface, i + 1, corners)
+        self.pickPoints = points
+        self.pickAvailable = available
+        self.pickCount = len(self.availableBranches)
+
+    def render(self):
+        # Bring the drawing of the tree on renderSurface up to date. Only
+        # the part of it around branches that turned available, or that a
+        # sway moved more than renderTolerance pixels since they were
+        # drawn, is cleared, and only the branches crossing it are drawn
+        # again, the rest where they were drawn last. Returns whether
+        # anything was drawn, or None when more than renderLimit of the
+        # branches would have to be, which leaves the drawing as it was.
+        count = len(self.availableBranches)
+        if self.renderSurface is not None and self.renderCount == count \
+                and (self.sway is None or
+                     self.renderPose == self.sway.poses):
+            return False
+        points = self.branchPoints()
+        available = self.availableMask()
+        if self.renderSurface is None or not self.fits(
+                points, self.renderCorner, self.renderSurface.get_size()):
+            self.renderCorner, size = self.surfaceBox(points)
+            self.renderSurface = pygame.Surface(size)
+            self.renderSurface.set_colorkey(treeDrawing.renderKey)
+            region = self.renderSurface.get_rect()
+            crossing = np.ones(len(self.branches), dtype=bool)
+            drawn = points
+        else:
+            dirty = (available != self.renderAvailable) | \
+                (np.abs(points - self.renderPoints).max((1, 2)) >
+                 self.renderTolerance)
+            if not dirty.any():
+                return False
+            changed = np.concatenate([points[dirty],
+                                      self.renderPoints[dirty]], 1)
+            low, high = self.pixelBox(changed - self.renderCorner)
+            region = pygame.Rect(low.tolist(), (high - low).tolist())
+            drawn = np.where(dirty[:, None, None], points,
+                             self.renderPoints)
+            low = drawn.min(1) - self.renderCorner - 2
+            high = drawn.max(1) - self.renderCorner + 2
+            crossing = (low[:, 0] < region.right) & \
+                (high[:, 0] > region.left) & \
+                (low[:, 1] < region.bottom) & (high[:, 1] > region.top)
+            if crossing.sum() > self.renderLimit * len(self.branches):
+                return None
+        if self.sway is not None:
+            self.renderPose = self.sway.poses
+        self.renderCount = count
+        self.renderPoints = drawn
+        self.renderAvailable = available
+        surface = self.renderSurface
+        surface.set_clip(region)
+        surface.fill(treeDrawing.renderKey, region)
+        self.drawBranches(surface, drawn - self.renderCorner, available,
+                          crossing)
+        surface.set_clip(None)
+        return True
+
+    def drawBranches(self, surface, points, available, only=None):
+        # Draw the branches with polygon corners points in drawTree's
+        # order, or only those marked in only
+        black = (0, 0, 0)
+        red = (204, 160, 36)
+        for i in self.drawOrder(available).tolist():
+            if only is None or only[i]:
+                color = black
+                if available[i]:
+                    color = (red[0], red[1] - 19 * self.branches[i].depth,
+                             red[2])
+                corners = points[i].tolist()
+                pygame.draw.lines(surface, color, True, corners, 2)
+                pygame.draw.polygon(surface, color, corners)
+
+    def branchPoints(self):
+        # Polygon corners of every branch, relative to the rect's corner
+        if self.sway is not None:
+            return self.sway.points - self.rect[0]
+        return np.array([branch.polygon.pointList
+                         for branch in self.branches],
+                        dtype=float) - self.rect[0]
+
+    def availableMask(self):
+        available = np.zeros(len(self.branches), dtype=bool)
+        available[[branch.index for branch in self.availableBranches]] = True
+        return available
+
+    def drawOrder(self, available):
+        # Branch indices in the order drawTree draws them, available
+        # branches last
+        return np.concatenate([np.flatnonzero(~available),
+                               [branch.index for branch in
+                                self.availableBranches]]).astype(int)
+
+    @staticmethod
+    def pixelBox(points):
+        # Whole pixel corners around points, with room for an outline
+        low = np.floor(points.reshape(-1, 2).min(0)).astype(int) - 2
+        high = np.ceil(points.reshape(-1, 2).max(0)).astype(int) + 2
+        return low, high
+
+    def surfaceBox(self, points):
+        # Corner and size of a surface around points, with room for a sway
+        # to move the tree about without a new surface
+        slack = 0 if self.sway is None else int(self.sway.slack) + 1
+        low, high = treeDrawing.pixelBox(points)
+        return low - slack, high - low + 2 * slack
+
+    def fits(self, points, corner, size):
+        # Whether points lie on a surface of size at corner
+        low, high = treeDrawing.pixelBox(points)
+        return (low >= corner).all() and (high <= np.add(corner, size)).all()
 
     @staticmethod
     def calculateEndpoint(startPoint, length, angle):
@@ -373,6 +353,22 @@ class treeDrawing(object):
         self.availableBranches.append(curBranch)
         self.availableBranches.append(self.branches[0])
         self.scale = 1
+        # TreeSway moving the branches, if any
+        self.sway = None
+        for i, branch in enumerate(self.branches):
+            branch.tree, branch.index = self, i
+        # Picking raster, drawn on first use by pickRaster
+        self.picking = None
+        self.pickTolerance = 1
+        self.pickPose = -1
+        # Drawing of the tree, drawn on first use by render
+        self.renderSurface = None
+        self.renderTolerance = 1
+        self.renderPose = -1
+        self.renderIdle = 0
+        self.renderSettle = 30
+        self.renderPacked = None
+        self.renderLimit = 0.3
         self.rect = self.findRect()
 
     def scaleTree(self, factor):
@@ -387,6 +383,8 @@ class treeDrawing(object):
             branch.end = endpoint
             branch.polygon.scale(factor)
         self.rect = self.findRect()
+        self.picking = None
+        self.renderSurface = None
 
     def changePos(self, xChange, yChange):
         for branch in self.branches:
@@ -398,19 +396,40 @@ class treeDrawing(object):
         self.rect = self.findRect()
 
     def drawTree(self, gameDisplay):
-        black = (0, 0, 0)
-        red = (204, 160, 36)
-        for branch in self.branches:
-            if branch not in self.availableBranches:
-                branch.draw(gameDisplay, black)
-        for branch in self.availableBranches:
-            newColor = (red[0], red[1] - 19 * branch.depth, red[2])
-            branch.draw(gameDisplay, newColor)
+        # One blit of the cached drawing, brought up to date. When too much
+        # of the tree has moved for that to pay, as in a strong wind, the
+        # branches are drawn straight onto the screen instead. A drawing
+        # left alone for renderSettle frames is blitted from a run length
+        # encoded copy, which blits many times faster but is too slow to
+        # draw on.
+        drawn = self.render()
+        if drawn is None:
+            self.renderIdle = 0
+            self.drawBranches(gameDisplay, self.branchPoints() + self.rect[0],
+                              self.availableMask())
+            return
+        if drawn:
+            self.renderIdle = 0
+            self.renderPacked = None
+        else:
+            self.renderIdle += 1
+            if self.renderIdle == self.renderSettle:
+                self.renderPacked = self.renderSurface.copy()
+                self.renderPacked.set_colorkey(treeDrawing.renderKey,
+                                               pygame.RLEACCEL)
+        gameDisplay.blit(self.renderSurface if self.renderPacked is None
+                         else self.renderPacked,
+                         (self.rect[0][0] + self.renderCorner[0],
+                          self.rect[0][1] + self.renderCorner[1]))
 
     def __repr__(self):
         return str(self.branches)
 
     def findRect(self):
+        # A swaying tree keeps the rect it had at rest, so the web, which
+        # is drawn relative to it, doesn't move with the twigs
+        if self.sway is not None:
+            return self.sway.rect()
         minX = self.branches[0].start[0]
         maxX = self.branches[0].start[0]
         minY = self.branches[0].start[1]
@@ -477,6 +496,473 @@ class treeDrawing(object):
     #     return path
 
 
+class TreeSway(object):
+    # Sways every branch of a tree in the wind. Each branch leans by an
+    # angle that swings faster and further the further out it is from the
+    # trunk, and carries every branch growing from it, so a branch's pose
+    # is the sum of the leans of all its ancestors. With the ancestors of
+    # every branch in one index array each frame is a few gathers and
+    # sums, whatever the shape of the tree. Fixed web nodes on a branch
+    # are carried along with it.
+
+    def __init__(self, tree, swayAngle=0.03, frequency=0.6, fullWind=450):
+        branches = tree.branches
+        self.tree = tree
+        index = dict((id(branch), i) for i, branch in enumerate(branches))
+        count = len(branches)
+        self.parent = np.array([-1 if branch.orig is None else
+                                index[id(branch.orig)]
+                                for branch in branches], dtype=np.intp)
+        # Row i lists branch i and its ancestors, padded with count, which
+        # points at a zero past the end of whatever is gathered
+        level = np.array([tree.maxDepth - branch.depth
+                          for branch in branches], dtype=np.intp)
+        self.ancestors = np.full((count, level.max() + 1), count,
+                                 dtype=np.intp)
+        for i in range(count):
+            j = i
+            while j >= 0:
+                self.ancestors[i, level[j]] = j
+                j = self.parent[j]
+        # Every branch at rest as the step from its parent's end to its own
+        # end, so the branches stay joined however they lean
+        self.root = branches[0].start
+        start = np.array([branch.start for branch in branches], dtype=float)
+        end = np.array([branch.end for branch in branches], dtype=float)
+        joint = np.where(self.parent[:, None] >= 0, end[self.parent],
+                         start)
+        self.restX, self.restY = (end - joint).T
+        self.baseHalf = np.array([branch.polygon.baseWidth // 2
+                                  for branch in branches], dtype=float)
+        self.endHalf = np.array([branch.polygon.endWidth // 2
+                                 for branch in branches], dtype=float)
+        # The trunk stands still and the twigs lean up to swayAngle radians
+        # each at full wind, swinging up to twice as fast
+        share = level / max(level.max(), 1)
+        self.amplitude = swayAngle * share**2
+        self.frequency = 2 * np.pi * frequency * (1 + share)
+        self.phase = np.random.uniform(0, 2 * np.pi, count)
+        self.fullWind = fullWind
+        self.time = 0
+        # Offset of the rest rect from the root, which only changePos moves
+        restRect = tree.findRect()
+        self.corner = (restRect[0][0] - self.root[0],
+                       restRect[0][1] - self.root[1])
+        self.size = restRect[1]
+        # Furthest any branch end can move from where it rests, each
+        # ancestor turning it about that ancestor's joint
+        reach = np.hypot(end[:, 0, None] - np.append(joint[:, 0], 0)[
+            self.ancestors], end[:, 1, None] - np.append(joint[:, 1], 0)[
+            self.ancestors])
+        self.slack = (np.append(self.amplitude, 0)[self.ancestors] *
+                      reach).sum(1).max()
+        # Polygon corners, then start and end, of every branch. The first
+        # four rows are the points TreeCollider.place takes.
+        self.layout = np.zeros((count, 6, 2))
+        self.points = self.layout[:, :4]
+        self.angle = np.zeros(count)
+        # Poses taken so far
+        self.poses = 0
+        self.pose()
+        # Fixed web nodes tied to a branch, with where they sit on it at
+        # rest, where they were last carried to and the topology they were
+        # tied for
+        self.nodes = np.zeros(0, dtype=np.intp)
+        self.nodeBranch = np.zeros(0, dtype=np.intp)
+        self.along = np.zeros(0)
+        self.across = np.zeros(0)
+        self.nodeX = np.zeros(0)
+        self.nodeY = np.zeros(0)
+        self.tieVersion = -1
+
+    def rect(self):
+        return ((self.root[0] + self.corner[0],
+                 self.root[1] + self.corner[1]), self.size)
+
+    def update(self, frameTime, wind):
+        # Move the tree on by frameTime seconds in wind, the mean wind speed
+        self.time += frameTime
+        strength = min(wind / self.fullWind, 1)
+        lean = np.append(self.amplitude * strength *
+                         np.sin(self.frequency * self.time + self.phase), 0)
+        self.angle = lean[self.ancestors].sum(1)
+        self.pose()
+
+    def pose(self):
+        # Branch ends, starts and polygons for the current angles, written
+        # back to the branches
+        self.poses += 1
+        self.cos, self.sin = np.cos(self.angle), np.sin(self.angle)
+        stepX = np.append(self.restX * self.cos - self.restY * self.sin, 0)
+        stepY = np.append(self.restX * self.sin + self.restY * self.cos, 0)
+        endX = self.root[0] + stepX[self.ancestors].sum(1)
+        endY = self.root[1] + stepY[self.ancestors].sum(1)
+        root = self.parent < 0
+        self.startX = np.where(root, self.root[0], endX[self.parent])
+        self.startY = np.where(root, self.root[1], endY[self.parent])
+        layout = self.layout
+        layout[:, 0, 0] = self.startX - self.baseHalf
+        layout[:, 1, 0] = endX - self.endHalf
+        layout[:, 2, 0] = endX + self.endHalf
+        layout[:, 3, 0] = self.startX + self.baseHalf
+        layout[:, 0, 1] = layout[:, 3, 1] = layout[:, 4, 1] = self.startY
+        layout[:, 1, 1] = layout[:, 2, 1] = layout[:, 5, 1] = endY
+        layout[:, 4, 0], layout[:, 5, 0] = self.startX, endX
+        for branch, points in zip(self.tree.branches, layout.tolist()):
+            branch.start[:] = points[4]
+            branch.end = points[5]
+            polygon = branch.polygon
+            polygon.baseLeft, polygon.endLeft, polygon.endRight, \
+                polygon.baseRight = polygon.pointList = points[:4]
+
+    def tie(self, web, origin):
+        # Tie every fixed node to the branch nearest it. Nodes still where
+        # they were last carried keep their old place on their branch.
+        n = web.numNodes
+        nodes = np.flatnonzero(web.alive[:n] & web.fixed[:n])
+        old = np.minimum(np.searchsorted(self.nodes, nodes),
+                         max(len(self.nodes) - 1, 0))
+        kept = np.zeros(len(nodes), dtype=bool)
+        if len(self.nodes) > 0:
+            kept = (self.nodes[old] == nodes) & \
+                (self.nodeX[old] == web.x[nodes]) & \
+                (self.nodeY[old] == web.y[nodes])
+        x, y = web.x[nodes] + origin[0], web.y[nodes] + origin[1]
+        branch = np.zeros(len(nodes), dtype=np.intp)
+        along, across = np.zeros(len(nodes)), np.zeros(len(nodes))
+        branch[kept] = self.nodeBranch[old[kept]]
+        along[kept] = self.along[old[kept]]
+        across[kept] = self.across[old[kept]]
+        new = np.flatnonzero(~kept)
+        if len(new) > 0:
+            endX = self.startX + self.restX * self.cos - self.restY * self.sin
+            endY = self.startY + self.restX * self.sin + self.restY * self.cos
+            branch[new] = pointSegmentDistance(
+                x[new, None], y[new, None], self.startX, self.startY, endX,
+                endY).argmin(1)
+            b = branch[new]
+            offsetX, offsetY = x[new] - self.startX[b], y[new] - self.startY[b]
+            along[new] = offsetX * self.cos[b] + offsetY * self.sin[b]
+            across[new] = offsetY * self.cos[b] - offsetX * self.sin[b]
+        self.nodes, self.nodeBranch = nodes, branch
+        self.along, self.across = along, across
+        self.nodeX, self.nodeY = web.x[nodes], web.y[nodes]
+        self.tieVersion = web.topologyVersion
+
+    def carry(self, web, origin):
+        # Move every fixed node of web, in coordinates relative to origin,
+        # along with its branch
+        if self.tieVersion != web.topologyVersion:
+            self.tie(web, origin)
+        if len(self.nodes) == 0:
+            return
+        b = self.nodeBranch
+        self.nodeX = self.startX[b] + self.along * self.cos[b] - \
+            self.across * self.sin[b] - origin[0]
+        self.nodeY = self.startY[b] + self.along * self.sin[b] + \
+            self.across * self.cos[b] - origin[1]
+        web.moveFixed(self.nodes, self.nodeX, self.nodeY)
+
+
+class TreeCollider(object):
+    # Every branch of a tree as a tapered capsule along the middle of its
+    # polygon, in web coordinates, for keeping strands out of the wood.
+    # Each branch is filed once under the grid cells its capsule comes
+    # near, so a step only tests a short spring against the branches filed
+    # in the cell of its midpoint. The few springs longer than a cell are
+    # tested against the box of every branch. Branches are filed slack
+    # pixels wider than they are, so a swaying tree can be moved with place
+    # without filing it again.
+
+    def __init__(self, tree, cellSize=32, slack=0):
+        origin = tree.rect[0]
+        points = np.array([branch.polygon.pointList
+                           for branch in tree.branches], dtype=float)
+        points -= origin
+        self.place(points)
+        # Tangential speed kept by a node touching a branch per step, and
+        # the furthest a node is pushed out of a branch in one step
+        self.friction = 0.5
+        self.maxPush = 4
+        self.cellSize = cellSize
+        self.slack = slack
+        self.file(points)
+
+    def place(self, points):
+        # Capsules for branch polygons with the corners points, in web
+        # coordinates
+        baseLeft, endLeft = points[:, 0], points[:, 1]
+        endRight, baseRight = points[:, 2], points[:, 3]
+        self.x0, self.y0 = (baseLeft + baseRight).T / 2
+        self.x1, self.y1 = (endLeft + endRight).T / 2
+        # The polygons are widened sideways, so the width across a branch
+        # shrinks with how far it leans
+        length = np.hypot(self.x1 - self.x0, self.y1 - self.y0)
+        lean = np.abs(self.y1 - self.y0) / np.maximum(length, 1)
+        self.radius0 = (baseRight[:, 0] - baseLeft[:, 0]) / 2 * lean
+        self.radius1 = (endRight[:, 0] - endLeft[:, 0]) / 2 * lean
+        self.radius = np.maximum(self.radius0, self.radius1)
+        self.left = np.minimum(self.x0, self.x1) - self.radius
+        self.right = np.maximum(self.x0, self.x1) + self.radius
+        self.top = np.minimum(self.y0, self.y1) - self.radius
+        self.bottom = np.maximum(self.y0, self.y1) + self.radius
+
+    def file(self, points):
+        # Grid over the tree with every branch listed under each cell a
+        # spring of up to half a cell could touch it from
+        reach = self.cellSize / 2 + self.slack
+        low = points.min(1) - reach
+        high = points.max(1) + reach
+        self.gridLeft, self.gridTop = low.min(0)
+        cells = ((np.concatenate([low, high], axis=1) -
+                  [self.gridLeft, self.gridTop] * 2) //
+                 self.cellSize).astype(np.intp)
+        self.columns = cells[:, 2].max() + 1
+        self.rows = cells[:, 3].max() + 1
+        keys, branches = [], []
+        for i, (c0, r0, c1, r1) in enumerate(cells):
+            column, row = np.meshgrid(np.arange(c0, c1 + 1),
+                                      np.arange(r0, r1 + 1))
+            column, row = column.ravel(), row.ravel()
+            # Only cells whose middle is within a half diagonal of the
+            # padded capsule
+            near = pointSegmentDistance(
+                self.gridLeft + (column + 0.5) * self.cellSize,
+                self.gridTop + (row + 0.5) * self.cellSize,
+                self.x0[i], self.y0[i], self.x1[i], self.y1[i]) <= \
+                self.radius[i] + reach + self.cellSize * 0.7072
+            keys.append(row[near] * self.columns + column[near])
+            branches.append(np.full(near.sum(), i, dtype=np.intp))
+        keys, branches = np.concatenate(keys), np.concatenate(branches)
+        order = np.argsort(keys, kind="stable")
+        self.cellBranches = branches[order]
+        self.cellStart = np.searchsorted(
+            keys[order], np.arange(self.columns * self.rows + 1))
+
+    def contacts(self, ax, ay, bx, by):
+        # Every spring and branch whose boxes overlap, as spring and branch
+        # index arrays
+        midX, midY = (ax + bx) / 2, (ay + by) / 2
+        half = np.hypot(bx - ax, by - ay) / 2
+        short = half <= self.cellSize / 2
+        column = (midX - self.gridLeft) // self.cellSize
+        row = (midY - self.gridTop) // self.cellSize
+        inside = short & (column >= 0) & (column < self.columns) & \
+            (row >= 0) & (row < self.rows)
+        springs = np.flatnonzero(inside)
+        cell = (row[springs] * self.columns +
+                column[springs]).astype(np.intp)
+        start = self.cellStart[cell]
+        counts = self.cellStart[cell + 1] - start
+        springs = np.repeat(springs, counts)
+        offsets = np.arange(len(springs)) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        branches = self.cellBranches[np.repeat(start, counts) + offsets]
+        long = np.flatnonzero(~short)
+        if len(long) > 0:
+            x, y, half = midX[long, None], midY[long, None], half[long, None]
+            near = (x + half >= self.left) & (x - half <= self.right) & \
+                (y + half >= self.top) & (y - half <= self.bottom)
+            longSprings, longBranches = np.nonzero(near)
+            springs = np.concatenate([springs, long[longSprings]])
+            branches = np.concatenate([branches, longBranches])
+        overlap = (np.maximum(ax, bx)[springs] >= self.left[branches]) & \
+            (np.minimum(ax, bx)[springs] <= self.right[branches]) & \
+            (np.maximum(ay, by)[springs] >= self.top[branches]) & \
+            (np.minimum(ay, by)[springs] <= self.bottom[branches])
+        return springs[overlap], branches[overlap]
+
+    def collide(self, web):
+        # Push the awake nodes of every spring cutting into a branch back
+        # out along the branch's normal, taking away the speed into the
+        # branch and some of the speed along it so strands can rest there
+        batch = web.awakeBatch()
+        if batch is None:
+            return
+        a, b = batch.nodes[batch.a], batch.nodes[batch.b]
+        ax, ay, bx, by = web.x[a], web.y[a], web.x[b], web.y[b]
+        springs, branches = self.contacts(ax, ay, bx, by)
+        if len(springs) == 0:
+            return
+        a, b = a[springs], b[springs]
+        ax, ay, bx, by = ax[springs], ay[springs], bx[springs], by[springs]
+        cx, cy = self.x0[branches], self.y0[branches]
+        dx, dy = self.x1[branches], self.y1[branches]
+        s, u = closestSegmentPoints(ax, ay, bx, by, cx, cy, dx, dy)
+        normalX = ax + s * (bx - ax) - (cx + u * (dx - cx))
+        normalY = ay + s * (by - ay) - (cy + u * (dy - cy))
+        distance = np.hypot(normalX, normalY)
+        radius = self.radius0[branches] + \
+            u * (self.radius1[branches] - self.radius0[branches])
+        hit = np.flatnonzero(distance < radius)
+        if len(hit) == 0:
+            return
+        a, b, s, radius, distance = a[hit], b[hit], s[hit], radius[hit], \
+            distance[hit]
+        ax, ay, bx, by = ax[hit], ay[hit], bx[hit], by[hit]
+        cx, cy, dx, dy = cx[hit], cy[hit], dx[hit], dy[hit]
+        normalX, normalY = normalX[hit], normalY[hit]
+        weightA = (~web.fixed[a]).astype(float)
+        weightB = (~web.fixed[b]).astype(float)
+        # A strand tied to a branch starts inside it
+        tiedX = np.where(weightA == 0, ax, bx)
+        tiedY = np.where(weightA == 0, ay, by)
+        tied = np.flatnonzero(weightA * weightB == 0)
+        tied = tied[pointSegmentDistance(
+            tiedX[tied], tiedY[tied], cx[tied], cy[tied], dx[tied],
+            dy[tied]) <= radius[tied]]
+        # A spring through the middle of a branch goes out over the top
+        across = np.hypot(dx - cx, dy - cy)
+        up = np.where(dx - cx < 0, 1, -1)
+        flat = distance < 1e-9
+        normalX = np.where(flat, up * (cy - dy) / across,
+                           normalX / np.where(flat, 1, distance))
+        normalY = np.where(flat, up * (dx - cx) / across,
+                           normalY / np.where(flat, 1, distance))
+        # Move the closest point on the spring out of the branch, shared
+        # between its free ends by how close it is to each. A free end
+        # never moves further than the point went in.
+        share = weightA * (1 - s) + weightB * s
+        push = np.minimum(radius - distance, self.maxPush) / \
+            np.where(share > 0, share, 1)
+        push[share == 0] = 0
+        push[tied] = 0
+        n = web.numNodes
+        ends = np.concatenate([a, b])
+        moveX = np.bincount(ends, np.concatenate(
+            [weightA * (1 - s) * push * normalX,
+             weightB * s * push * normalX]), n)
+        moveY = np.bincount(ends, np.concatenate(
+            [weightA * (1 - s) * push * normalY,
+             weightB * s * push * normalY]), n)
+        nodes = np.flatnonzero((moveX != 0) | (moveY != 0))
+        moveX, moveY = moveX[nodes], moveY[nodes]
+        moved = np.hypot(moveX, moveY)
+        web.x[nodes] += moveX
+        web.y[nodes] += moveY
+        normalX, normalY = moveX / moved, moveY / moved
+        xVel, yVel = web.xVel[nodes], web.yVel[nodes]
+        into = np.minimum(xVel * normalX + yVel * normalY, 0)
+        xVel, yVel = xVel - into * normalX, yVel - into * normalY
+        along = xVel * normalY - yVel * normalX
+        web.xVel[nodes] = xVel - (1 - self.friction) * along * normalY
+        web.yVel[nodes] = yVel + (1 - self.friction) * along * normalX
+
+
+class OrbWeaver(object):
+    # Weaves a radial orb web between branches of a tree: spokes from
+    # points along the branches in to a hub between them, and rings
+    # across each pair of neighbouring spokes. All spokes are built with
+    # one Rope.weave, all rings with another, and one Web.weld ties the
+    # spokes together at the hub and the rings onto the spokes.
+
+    def __init__(self, rings=8, anchorsPerBranch=3, density=0.07,
+                 relaxPasses=100):
+        self.rings = rings
+        self.anchorsPerBranch = anchorsPerBranch
+        # Free nodes per pixel of strand, as when a strand is drawn
+        self.density = density
+        self.relaxPasses = relaxPasses
+
+    def anchors(self, tree, branches):
+        # Points spread along the outer part of each branch, where branches
+        # are furthest apart, on the side of the branch facing the others.
+        # In web coordinates.
+        points = np.array([branch.polygon.pointList for branch in branches],
+                          dtype=float) - tree.rect[0]
+        middle = points.mean(1)
+        left = np.linalg.norm(points[:, :2].mean(1) - middle.mean(0), axis=1)
+        right = np.linalg.norm(points[:, 2:].mean(1) - middle.mean(0), axis=1)
+        inner = (left < right)[:, None]
+        start = np.where(inner, points[:, 0], points[:, 3])
+        end = np.where(inner, points[:, 1], points[:, 2])
+        along = np.linspace(0.4, 0.9, self.anchorsPerBranch)
+        return (start[:, None] + (end - start)[:, None] *
+                along[:, None]).reshape(-1, 2)
+
+    def weave(self, tree, branches, web):
+        # Returns the new Ropes, spokes first
+        anchors = self.anchors(tree, branches)
+        hubX, hubY = anchors.mean(0)
+        angle = np.arctan2(anchors[:, 1] - hubY, anchors[:, 0] - hubX)
+        order = np.argsort(angle)
+        anchors, angle = anchors[order], angle[order]
+        count = len(anchors)
+        reach = np.hypot(anchors[:, 0] - hubX, anchors[:, 1] - hubY)
+        # No more rings than fit a node apart along a typical spoke, and
+        # enough nodes on each spoke for every ring to have its own. Every
+        # spoke gets as many nodes, so all pull on the hub alike and it
+        # stays in the middle.
+        ringCount = max(1, min(self.rings, int(np.median(reach) *
+                                               self.density) - 1))
+        numNodes = np.full(count, max(ringCount + 1,
+                                      int(reach.max() * self.density)))
+        spokes = Rope.weave(web, anchors[:, 0], anchors[:, 1],
+                            np.full(count, hubX), np.full(count, hubY),
+                            numNodes, fixed1=False)
+        # Ring r crosses each spoke at its node nearest r / (rings + 1) of
+        # the way in from the anchor
+        fraction = np.arange(1, ringCount + 1) / (ringCount + 1)
+        crossing = []
+        for spoke, anchor, length in zip(spokes, anchors, reach):
+            nodes = np.array(spoke.chain()[0][1:-1])
+            inward = np.hypot(web.x[nodes] - anchor[0],
+                              web.y[nodes] - anchor[1])
+            crossing.append(nodes[np.abs(inward[:, None] - fraction *
+                                         length).argmin(0)])
+        # Neighbouring spokes more than half a turn apart have open sky
+        # between them and get no rings
+        gap = np.diff(angle, append=angle[0] + 2 * np.pi)
+        pairs = [(i, (i + 1) % count) for i in range(count)
+                 if count > 1 and gap[i] < np.pi]
+        ringA = [crossing[i] for i, j in pairs]
+        ringB = [crossing[j] for i, j in pairs]
+        ringA = np.concatenate(ringA or [[]]).astype(np.intp)
+        ringB = np.concatenate(ringB or [[]]).astype(np.intp)
+        # Rings shorter than a node apart would only clutter the hub
+        long = np.hypot(web.x[ringB] - web.x[ringA],
+                        web.y[ringB] - web.y[ringA]) * self.density >= 1
+        ringA, ringB = ringA[long], ringB[long]
+        x0, y0, x1, y1 = web.x[ringA], web.y[ringA], web.x[ringB], \
+            web.y[ringB]
+        rings = Rope.weave(web, x0, y0, x1, y1, (np.hypot(
+            x1 - x0, y1 - y0) * self.density).astype(int), fixed0=False,
+            fixed1=False)
+        # A ring's start is its leftmost end, which is where it meets
+        # spoke j rather than spoke i when it runs right to left
+        swap = x1 < x0
+        starts = np.array([ring.startNode.index for ring in rings],
+                          dtype=np.intp)
+        ends = np.array([ring.endNode.index for ring in rings],
+                        dtype=np.intp)
+        hubs = np.array([spoke.startNode.index if hubX < x else
+                         spoke.endNode.index
+                         for spoke, x in zip(spokes, anchors[:, 0])],
+                        dtype=np.intp)
+        web.weld(np.concatenate((hubs[1:], starts, ends)),
+                 np.concatenate((np.full(count - 1, hubs[0]),
+                                 np.where(swap, ringB, ringA),
+                                 np.where(swap, ringA, ringB))))
+        self.relax(web, np.concatenate([rope.nodeIndices for rope in
+                                        spokes + rings] + [hubs[:1]]))
+        return spokes + rings
+
+    def relax(self, web, nodes):
+        # Move each free node to the middle of its neighbours over and over,
+        # which brings the web close to where its taut springs balance, so
+        # it starts nearly at rest instead of snapping through itself
+        nodes = np.unique(nodes[~web.fixed[nodes]])
+        indptr, neighbors, edgeSprings = web.adjacency()
+        start, count = indptr[nodes], indptr[nodes + 1] - indptr[nodes]
+        owner = np.repeat(np.arange(len(nodes)), count)
+        around = neighbors[np.repeat(start, count) + np.arange(len(owner)) -
+                           np.repeat(np.cumsum(count) - count, count)]
+        for i in range(self.relaxPasses):
+            web.x[nodes] = np.bincount(owner, web.x[around]) / count
+            web.y[nodes] = np.bincount(owner, web.y[around]) / count
+        web.xLast[nodes], web.yLast[nodes] = web.x[nodes], web.y[nodes]
+
+
 # Other Classes
 
 
@@ -490,8 +976,10 @@ class Bug(object):
         self.yVel = 0
         self.depth = random.randint(0, 5)
         self.radius = 3
+        self.lastX, self.lastY = x, y
 
     def update(self):
+        self.lastX, self.lastY = self.x, self.y
         self.x += self.xVel
         if self.yVel is not None:
             self.y -= self.yVel
@@ -507,10 +995,12 @@ class Bug(object):
         pygame.draw.circle(gameDisplay, (201, 101, 68),
                            (self.x, self.y), self.radius)
 
-    def checkWebCollision(self, gameDisplay):
-        if (self.x > 0 and self.x < gameDisplay.get_width() and
-                self.y > 0 and self.y < gameDisplay.get_height()):
-            if gameDisplay.get_at((self.x, self.y)) == (255, 255, 255, 255):
+    def checkWebCollision(self, onWeb, width, height):
+        # onWeb is whether this frame's path crossed a strand, from
+        # SpiderGame.bugsOnWeb
+        if (self.x > 0 and self.x < width and
+                self.y > 0 and self.y < height):
+            if onWeb:
                 self.yVel = None
                 self.xVel = 0
                 Bug.bugsCaught += 1
@@ -550,16 +1040,12 @@ class Hill(object):
 class Spider(object):
 
     @staticmethod
-    def findAdjacent(point, closedList, availableBranches):
+    def findAdjacent(point, closedList, tree):
         pointList = []
         for xdir in [-1, 0, 1]:
             for ydir in [-1, 0, 1]:
                 newPoint = (point[0] + xdir, point[1] + ydir)
-                onBranch = False
-                for branch in availableBranches:
-                    if branch.inBranch(newPoint):
-                        onBranch = True
-                if onBranch and newPoint not in closedList:
+                if tree.availableAt(newPoint) and newPoint not in closedList:
                     pointList.append(newPoint)
         return pointList
 
@@ -602,15 +1088,14 @@ class Spider(object):
                           self.startY - self.r - math.sqrt(3)),
                          (self.startX, self.startY))
 
-    def move(self, target, availableBranches, tree):
+    def move(self, target, tree):
         # Uses A* Pathfinding Algorithm
         closedList = [(self.x, self.y)]
         moveList = []
         pathFound = False
         while not pathFound:
             start = closedList[len(closedList) - 1]
-            openList = Spider.findAdjacent(
-                start, closedList, availableBranches)
+            openList = Spider.findAdjacent(start, closedList, tree)
             if len(openList) == 0:
                 moveList = []
                 break
@@ -703,6 +1188,61 @@ class Weather(object):
         self.maxWind = self.weatherState[1]
 
 
+class WindField(object):
+    # Wind over the whole scene as a tile of smooth noise that scrolls
+    # downwind, so gusts sweep across the web instead of every node getting
+    # the same push. Each noise value of 0 to 1 maps onto the weather's
+    # wind range, which eases towards a new weather state over a second or
+    # two rather than jumping.
+
+    def __init__(self, weather, size=32, cellSize=60):
+        self.size = size
+        self.cellSize = cellSize
+        # Low pass filtered white noise is smooth and tiles seamlessly
+        frequency = np.hypot(*np.meshgrid(np.fft.fftfreq(size),
+                                          np.fft.fftfreq(size)))
+        noise = np.real(np.fft.ifft2(np.fft.fft2(np.random.rand(size, size))
+                                     * np.exp(-(frequency * 12)**2)))
+        self.noise = (noise - noise.min()) / (noise.max() - noise.min())
+        self.minWind, self.maxWind = weather.minWind, weather.maxWind
+        self.xOffset = 0
+        self.yOffset = 0
+        # Pixels a second the gusts travel per unit of mean wind, and the
+        # share of the weather change caught up with every second
+        self.scrollRate = 0.5
+        self.easeRate = 0.8
+
+    def update(self, weather, frameTime):
+        ease = min(1, self.easeRate * frameTime)
+        self.minWind += (weather.minWind - self.minWind) * ease
+        self.maxWind += (weather.maxWind - self.maxWind) * ease
+        speed = (self.minWind + self.maxWind) / 2 * self.scrollRate
+        self.xOffset -= speed * frameTime
+        self.yOffset -= 0.2 * speed * frameTime
+
+    def sample(self, x, y):
+        # Bilinear lookup of the wind at every point of x and y at once
+        gridX = (x + self.xOffset) / self.cellSize
+        gridY = (y + self.yOffset) / self.cellSize
+        left, top = np.floor(gridX), np.floor(gridY)
+        xFraction, yFraction = gridX - left, gridY - top
+        left = left.astype(int) % self.size
+        top = top.astype(int) % self.size
+        right, bottom = (left + 1) % self.size, (top + 1) % self.size
+        noise = self.noise
+        upper = noise[top, left] + (noise[top, right] -
+                                    noise[top, left]) * xFraction
+        lower = noise[bottom, left] + (noise[bottom, right] -
+                                       noise[bottom, left]) * xFraction
+        value = upper + (lower - upper) * yFraction
+        return self.minWind + (self.maxWind - self.minWind) * value
+
+    def applyWind(self, web):
+        n = web.numNodes
+        nodes = np.flatnonzero(web.alive[:n] & ~web.fixed[:n])
+        web.setWind(nodes, self.sample(web.x[nodes], web.y[nodes]))
+
+
 class Cloud(object):
 
     def __init__(self, x, y):
@@ -763,11 +1303,40 @@ class SpiderGame(object):
         self.width = width
         self.height = height
         self.fps = 150
+        # Physics runs at a fixed rate whatever the frame rate is
+        self.physicsRate = 150
+        self.maxPhysicsSteps = 8
+        self.physicsTime = 0
+        self.frameTime = 0
+        # Ticks of the whole simulation per frame, stepped through with T.
+        # Ticks past the first stop once a frame has spent warpBudget
+        # milliseconds on them, so a big web slows the warp down rather
+        # than the game.
+        self.timeScales = (1, 2, 8, 32)
+        self.timeScale = 1
+        self.warpBudget = 40
         self.mode = SpiderGame.START
         self.ropeList = []
+        self.web = Web()
+        # Past this many nodes the oldest strands fade out over decayFrames
+        # frames and go, so a long game keeps its frame rate
+        self.web.nodeBudget = 3000
+        self.decayFrames = 60
+        self.decaying = {}
+        self.webGrid = WebGrid()
+        # Keeps strands out of the branches once a tree is chosen
+        self.treeCollider = None
+        # Strands swinging through each other stick where they cross; None
+        # lets them pass
+        self.webContacts = WebContacts(WebContacts.STICK)
         self.bugList = []
         self.ropeSurface = None
-        self.wind = 0
+        self.ropeVersion = -1
+        self.remeshFrame = 0
+        self.remeshIndex = 0
+        self.remeshInterval = 10
+        self.remeshCount = 20
+        self.windField = WindField(self.weather)
         self.webLevel = 30
         self.tree = treeDrawing(
             (width // 2, height - 100), random.randint(6, 7))
@@ -816,26 +1385,56 @@ class SpiderGame(object):
             if self.mode == SpiderGame.DRAW_WEB:
                 self.drawWebLabel()
             self.drawGround()
-            self.curBranch = self.tree.pointOnBranch((self.spider.startX,
-                                                      self.spider.startY))
             # CHECK ALL EVENTS
             self.checkEvents()
             # UPDATE OBJECT STATES
             if self.mode == SpiderGame.GAME_SCREEN:
-                self.updateBugs()
-                self.setWind()
                 self.updateSpider()
-                self.updateClouds()
-            rand = random.randint(0, 450)
-            if rand == 20:
-                self.weather.switchStates()
-            self.sky.update()
+            self.updateWorld()
+            self.warp()
             if self.mode == SpiderGame.DRAW_WEB:
                 self.drawLine()
-            if self.curBranch is None:
-                self.curBranch = self.tree.branches[0]
             pygame.display.update()
-            clock.tick(self.fps)
+            self.frameTime = clock.tick(self.fps) / 1000
+
+    def updateWorld(self):
+        # One tick of everything that moves on its own
+        if self.mode == SpiderGame.GAME_SCREEN:
+            self.updateBugs()
+            self.setWind()
+            self.updateClouds()
+        if self.mode == SpiderGame.GAME_SCREEN or \
+                self.mode == SpiderGame.DRAW_WEB:
+            self.swayTree()
+        rand = random.randint(0, 450)
+        if rand == 20:
+            self.weather.switchStates()
+        self.sky.update()
+
+    def warp(self):
+        # Run the rest of this frame's timeScale ticks. Only the last one
+        # is ever seen, so none of them draw.
+        web = self.ropeSurface is not None and \
+            (self.mode == SpiderGame.GAME_SCREEN or
+             self.mode == SpiderGame.DRAW_WEB)
+        start = pygame.time.get_ticks()
+        for tick in range(1, self.timeScale):
+            if pygame.time.get_ticks() - start > self.warpBudget:
+                break
+            if web:
+                self.stepWeb()
+            self.updateWorld()
+
+    def swayTree(self):
+        # Lean the branches in the wind and carry the strands tied to them
+        sway = self.tree.sway
+        if sway is None:
+            return
+        sway.update(self.frameTime,
+                    (self.windField.minWind + self.windField.maxWind) / 2)
+        origin = self.tree.rect[0]
+        self.treeCollider.place(sway.points - origin)
+        sway.carry(self.web, origin)
 
     def updateClouds(self):
         for cloud in self.clouds:
@@ -892,7 +1491,8 @@ class SpiderGame(object):
         font = pygame.font.Font(self.fontPath, 10)
         helpTitle = titleFont.render("SPIDER WEB GAME", True, (255, 255, 255))
         line1 = font.render("CLICK TO MOVE TO ANY COLORED BRANCH." +
-                            "PRESS W TO ENTER WEB DRAWING MODE.",
+                            "PRESS W TO ENTER WEB DRAWING MODE. " +
+                            "T SPEEDS UP TIME.",
                             True, (255, 255, 255))
         line2 = font.render(
             "IN WEB DRAWING MODE, CLICK FROM THE BRANCH" +
@@ -902,7 +1502,8 @@ class SpiderGame(object):
             "WATCH YOUR WEB LEVEl! BUILD MORE" +
             "WEBS TO CATCH MORE BUGS AND GET MORE WEB.",
             True, (255, 255, 255))
-        line4 = font.render("TRY TO COLOR YOUR WHOLE TREE.",
+        line4 = font.render("TRY TO COLOR YOUR WHOLE TREE. " +
+                            "PRESS A TO WEAVE AN ORB WEB WITH YOUR WEB LEFT.",
                             True, (255, 255, 255))
         self.helpButton = Button((self.width // 2 - 100, 400), 200, 60,
                                  "GOT IT!", 18, (132, 17, 21), (255, 255, 255),
@@ -965,10 +1566,29 @@ class SpiderGame(object):
         else:
             self.moving = False
 
+    def bugsOnWeb(self):
+        # Whether each bug's path this frame came within half a strand's 3
+        # pixel width of the web, for every bug in one grid lookup
+        x, y = self.tree.rect[0]
+        return self.webGrid.touching(
+            np.array([bug.lastX for bug in self.bugList], dtype=float) - x,
+            np.array([bug.lastY for bug in self.bugList], dtype=float) - y,
+            np.array([bug.x for bug in self.bugList], dtype=float) - x,
+            np.array([bug.y for bug in self.bugList], dtype=float) - y, 1.5)
+
     def updateBugs(self):
         for bug in self.bugList:
             bug.update()
-            bug.checkWebCollision(self.gameDisplay)
+        for bug, onWeb in zip(list(self.bugList), self.bugsOnWeb()):
+            bug.checkWebCollision(onWeb, self.width, self.height)
+            if bug.yVel is None:
+                # Caught bugs shake the strands they hit awake and give
+                # them back the detail to show it
+                hit = (bug.x - self.tree.rect[0][0],
+                       bug.y - self.tree.rect[0][1])
+                self.web.wakeNear(hit[0], hit[1], 20)
+                for rope in self.web.ropesNear(hit[0], hit[1], 30):
+                    rope.remesh(self.webView(), [hit])
             if bug.yVel is None and self.webLevel != SpiderGame.MAX_WEB:
                 self.webLevel += 1
             if bug.x > self.width or bug.yVel is None:
@@ -981,8 +1601,10 @@ class SpiderGame(object):
         font = pygame.font.Font(self.fontPath, 10)
         score = font.render(
             "BUGS CAUGHT: " + str(Bug.bugsCaught), True, (255, 255, 255))
-        speed = font.render("WIND SPEED: " + str(self.weather.weatherName),
-                            True, (255, 255, 255))
+        speed = "WIND SPEED: " + str(self.weather.weatherName)
+        if self.timeScale > 1:
+            speed += "  TIME: " + str(self.timeScale) + "X"
+        speed = font.render(speed, True, (255, 255, 255))
         web = font.render("WEB REMAINING: " + "|" *
                           (self.webLevel // 2), True, (255, 255, 255))
         self.scoreFrame = pygame.Surface(
@@ -994,17 +1616,94 @@ class SpiderGame(object):
         self.scoreFrame.blit(web, (5, 45))
         self.gameDisplay.blit(self.scoreFrame, (0, 0))
 
+    def stepWeb(self):
+        # One tick of the web. Returns how far into the next physics step
+        # we are, for interpolation.
+        self.remeshRopes()
+        alpha = self.stepPhysics()
+        self.evictRopes()
+        self.webGrid.update(self.web)
+        return alpha
+
     def updateRopes(self):
         if self.ropeSurface is not None:
-            self.ropeSurface.fill((0, 0, 0))
-            for rope in self.ropeList:
-                rope.updateRope()
-                rope.drawRope(self.ropeSurface)
+            alpha = self.stepWeb()
+            # A sleeping web looks the same every frame, keep the old drawing
+            if self.web.version != self.ropeVersion or \
+                    not self.web.isAsleep():
+                self.ropeSurface.fill((0, 0, 0))
+                view = self.webView()
+                for rope in self.ropeList:
+                    if rope.inView(view):
+                        shade = 255
+                        if rope in self.decaying:
+                            shade = max(40, 255 * self.decaying[rope] //
+                                        self.decayFrames)
+                        rope.drawRope(self.ropeSurface, (shade,) * 3,
+                                      alpha=alpha)
+                self.ropeVersion = self.web.version
             self.gameDisplay.blit(self.ropeSurface, (self.tree.findRect()[0]))
 
+    def evictRopes(self):
+        # Start the strands over the web's budget fading, and remove them
+        # once faded
+        if len(self.decaying) == 0:
+            for rope in self.web.ropesToEvict():
+                self.decaying[rope] = self.decayFrames
+            return
+        for rope in self.decaying:
+            self.decaying[rope] -= 1
+        self.ropeVersion = -1
+        gone = [rope for rope in self.decaying if self.decaying[rope] <= 0]
+        if len(gone) > 0:
+            self.web.removeRopes(gone)
+            for rope in gone:
+                del self.decaying[rope]
+            self.ropeList = [rope for rope in self.ropeList
+                             if self.web.ropes[rope.ropeId] is not None]
+
+    def webView(self):
+        # The screen, plus a margin, in rope surface coordinates
+        x, y = self.tree.rect[0]
+        return (-x - 50, -y - 50, self.width + 100, self.height + 100)
+
+    def remeshRopes(self):
+        # Every remeshInterval frames re-mesh the next remeshCount ropes, so
+        # the web's topology is only rebuilt now and then
+        self.remeshFrame += 1
+        if self.remeshFrame % self.remeshInterval != 0:
+            return
+        view = self.webView()
+        for i in range(min(self.remeshCount, len(self.ropeList))):
+            self.remeshIndex = (self.remeshIndex + 1) % len(self.ropeList)
+            self.ropeList[self.remeshIndex].remesh(view)
+
+    def stepPhysics(self):
+        # Run as many fixed physics steps as the last frame took, dropping
+        # the backlog past maxPhysicsSteps so a slow frame can't snowball.
+        # Returns how far into the next step we are, for interpolation.
+        stepTime = 1 / self.physicsRate
+        self.physicsTime += self.frameTime
+        # Strands out of sight are stepped less often
+        self.web.view = self.webView()
+        steps = 0
+        while self.physicsTime >= stepTime:
+            if steps == self.maxPhysicsSteps:
+                self.physicsTime %= stepTime
+                break
+            self.web.step()
+            if self.treeCollider is not None:
+                self.treeCollider.collide(self.web)
+            if self.webContacts is not None:
+                self.webContacts.collide(self.web)
+            self.physicsTime -= stepTime
+            steps += 1
+        return self.physicsTime / stepTime
+
     def setWind(self):
-        self.wind = random.randint(self.weather.minWind, self.weather.maxWind)
-        Rope.applyWind(self.wind, self.ropeList)
+        # Wind at every node from one lookup into the scrolling field
+        self.windField.update(self.weather, self.frameTime)
+        self.windField.applyWind(self.web)
 
     def treeSelectionEvents(self, keys):
         if keys[pygame.K_SPACE]:
@@ -1013,24 +1712,33 @@ class SpiderGame(object):
         elif keys[pygame.K_RETURN]:
             self.spider = Spider(self.tree.branches[0].start)
             self.tree.scaleTree(3.5)
+            self.tree.sway = TreeSway(self.tree)
             self.ground.scale(self.tree.branches[0].start, 3.5)
             self.spider.move((self.tree.availableBranches[0].start[0],
                               self.tree.availableBranches[0].start[1]),
-                             self.tree.availableBranches, self.tree)
+                             self.tree)
             self.ropeSurface = pygame.Surface(self.tree.findRect()[1])
             self.ropeSurface.set_colorkey((0, 0, 0))
+            self.treeCollider = TreeCollider(self.tree,
+                                             slack=self.tree.sway.slack)
+            self.ropeVersion = -1
             self.mode = SpiderGame.MAIN_HELP
             self.mainHelpInit()
 
+    def currentBranch(self):
+        # The branch under the spider, or the trunk when it's off the tree.
+        # Only looked up on a click, so a swaying tree only has its picking
+        # raster drawn again when it's needed.
+        branch = self.tree.pointOnBranch((self.spider.startX,
+                                          self.spider.startY))
+        return self.tree.branches[0] if branch is None else branch
+
     def pointInAvailableBranches(self, point):
-        for branch in self.tree.availableBranches:
-            if branch.inBranch(point):
-                return True
-        return False
+        return self.tree.availableAt(point)
 
     def drawWebEvents(self, event, keys):
         if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.curBranch.inBranch(pygame.mouse.get_pos()):
+            if self.currentBranch().inBranch(pygame.mouse.get_pos()):
                 if not self.drawingLine:
                     self.drawingLine = True
                     self.startTemp = pygame.mouse.get_pos()
@@ -1049,21 +1757,34 @@ class SpiderGame(object):
                                                  endTemp[1]) * 0.07)
                     if numNodes > 0 and numNodes <= self.webLevel:
                         newRope = Rope(numNodes, startX, startY,
-                                       endX, endY)
+                                       endX, endY, self.web)
                         self.ropeList.append(newRope)
                         self.webLevel -= numNodes
-                        for other in self.ropeList:
-                            newRope.solveIntersection(other)
-                        for branch in self.tree.branches:
-                            if branch.inBranch(endTemp):
-                                self.tree.availableBranches.append(branch)
-                                break
+                        newRope.solveIntersections(self.webGrid)
+                        # Strands drawn from the same spot share nodes
+                        newRope.weld(self.webGrid)
+                        branch = self.tree.pointOnBranch(endTemp)
+                        if branch is not None:
+                            self.tree.availableBranches.append(branch)
                         if len(self.tree.availableBranches) == len(self.tree.branches) and not self.didContinue:
                             self.mode = SpiderGame.END_GAME_SCREEN
                             self.endGameInit()
+        if keys[pygame.K_a]:
+            self.autoWeave()
         if keys[pygame.K_ESCAPE] or keys[pygame.K_w]:
             self.mode = SpiderGame.GAME_SCREEN
 
+    def autoWeave(self):
+        # Spend all the web left on an orb web between the colored
+        # branches, a ring for every three units of web
+        rings = self.webLevel // 3
+        if rings < 2:
+            return
+        self.ropeList.extend(OrbWeaver(rings).weave(
+            self.tree, self.tree.availableBranches, self.web))
+        self.webLevel = 0
+        self.drawingLine = False
+
     def gameScreenEvents(self, event, keys):
         if event.type == pygame.MOUSEBUTTONDOWN:
             movePoint = pygame.mouse.get_pos()
@@ -1073,8 +1794,7 @@ class SpiderGame(object):
                                       movePoint)
                 if path is not None:
                     for point in path:
-                        self.spider.move(point, self.tree.availableBranches,
-                                         self.tree)
+                        self.spider.move(point, self.tree)
                 self.spider.x = self.spider.startX
                 self.spider.y = self.spider.startY
         if keys[pygame.K_w]:
@@ -1117,6 +1837,12 @@ class SpiderGame(object):
             keys = pygame.key.get_pressed()
             if event.type == pygame.QUIT:
                 self.gameExit = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_t \
+                    and (self.mode == SpiderGame.GAME_SCREEN or
+                         self.mode == SpiderGame.DRAW_WEB):
+                self.timeScale = self.timeScales[
+                    (self.timeScales.index(self.timeScale) + 1) %
+                    len(self.timeScales)]
             elif self.mode == self.END_GAME_SCREEN:
                 self.endGameEvents(event, keys)
             elif self.mode == SpiderGame.MAIN_HELP:
@@ -1140,4 +1866,5 @@ class SpiderGame(object):
 #######################################################################
 # Main
 #######################################################################
-game = SpiderGame()
+if __name__ == "__main__":
+    game = SpiderGame()